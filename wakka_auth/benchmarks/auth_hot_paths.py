@@ -0,0 +1,318 @@
+"""
+Throughput and latency percentiles of the Wakka Auth hot paths.
+
+Seeds `--apps` applications with `--users-per-app` verified users each, on a
+fresh SQLite database by default or on the local MySQL database configured by
+the `WAKKA_DB_*` variables with `--database mysql`, then times each operation
+in-process, one call at a time. Password hashing uses the production hasher,
+so the paths which hash run `--hash-iterations` times only.
+
+Results are printed and, with `--output`, written as JSON together with the
+commit and the parameters of the run. `--compare` prints the change of the
+throughput against a previous JSON result.
+
+Usage: python benchmarks/auth_hot_paths.py [--apps 10] [--users-per-app 1000]
+           [--iterations 1000] [--output results.json] [--compare before.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+PASSWORD = "B3nchmark!password"
+
+
+def setup_django(database: str) -> None:
+    sys.path.insert(0, str(BASE_DIR))
+    os.environ["WAKKA_BENCHMARK_DATABASE"] = database
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+
+    import django
+
+    django.setup()
+
+
+def seed(apps: int, users_per_app: int, database: str) -> list:
+    """Creates the benchmark applications and users, unless they exist.
+    Returns the applications."""
+    from django.conf import settings
+    from django.core.management import call_command
+    from wakka.hashers import PasswordHashingExecutor
+    from wakka.models import Application, User
+
+    if database == "sqlite":
+        Path(settings.DATABASES["default"]["NAME"]).unlink(missing_ok=True)
+    call_command("migrate", verbosity=0)
+
+    # users share one password hash, verifying it costs the same for all
+    password_hash = PasswordHashingExecutor.make_password(PASSWORD)
+    applications = []
+    for index in range(apps):
+        app_name = f"bench_{index}"
+        app = Application.objects.filter(app_name=app_name).first()
+        if app is None:
+            app = Application(app_name=app_name, title=f"Benchmark {index}")
+            app.generate_server_api_key()
+            User.objects.bulk_create(
+                (
+                    User(
+                        email=f"user{user}@{app_name}.example.com",
+                        username=f"{app_name}$$user{user}@{app_name}.example.com",
+                        name=f"User {user}",
+                        password=password_hash,
+                        app=app,
+                        is_active=True,
+                        verified=True,
+                    )
+                    for user in range(users_per_app)
+                ),
+                batch_size=1000,
+            )
+        elif not app.server_api_key:
+            # the raw key is only known until it is nullified
+            app.generate_server_api_key()
+        applications.append(app)
+    return applications
+
+
+def measure(operation: Callable[[int], object], iterations: int) -> dict:
+    """Times `iterations` calls of `operation(i)`, latencies in milliseconds"""
+    operation(-1)  # warm up
+    latencies = []
+    start = time.perf_counter()
+    for i in range(iterations):
+        call_start = time.perf_counter()
+        operation(i)
+        latencies.append((time.perf_counter() - call_start) * 1000)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    percentiles = (
+        statistics.quantiles(latencies, n=100, method="inclusive")
+        if len(latencies) > 1
+        else latencies * 99
+    )
+    return {
+        "iterations": iterations,
+        "ops_per_second": iterations / elapsed,
+        "mean_ms": statistics.fmean(latencies),
+        "p50_ms": percentiles[49],
+        "p90_ms": percentiles[89],
+        "p99_ms": percentiles[98],
+        "max_ms": latencies[-1],
+    }
+
+
+def benchmarks(applications: list, users_per_app: int, iterations: int) -> dict:
+    """Operations to time by name, each with whether it hashes a password"""
+    from django.test import RequestFactory
+    from wakka.authentication import (
+        WakkaAppNameAuthentication,
+        WakkaServerAuthentication,
+    )
+    from wakka.constants import AuthTokenType, OneTimeTokenType
+    from wakka.models import User
+    from wakka.services import AuthService
+    from wakka.tokens import JWTToken, OneTimeJWTToken
+
+    rng = random.Random(0)
+
+    def random_user() -> tuple:
+        app = rng.choice(applications)
+        user = rng.randrange(users_per_app)
+        return app, f"user{user}@{app.app_name}.example.com"
+
+    sample = [random_user() for _ in range(min(iterations, 1000))]
+    users = {
+        user.email: user
+        for user in User.objects.select_related("app").filter(
+            email__in=[email for _, email in sample]
+        )
+    }
+    sample_users = [users[email] for _, email in sample]
+    # copies for the one time token verify benchmark, the other benchmarks
+    # change the users, e.g. their last login, which the tokens are bound to
+    copies = User.objects.select_related("app").in_bulk(
+        [user.pk for user in sample_users]
+    )
+    verify_users = [copies[user.pk] for user in sample_users]
+
+    def pick(items: list, i: int):
+        return items[i % len(items)]
+
+    refresh_tokens = [
+        JWTToken.obtain_refresh_token_for_user(user) for user in sample_users
+    ]
+    # distinct tokens, so the verified token cache never hits
+    access_tokens = [
+        JWTToken.obtain_access_token_for_user(pick(sample_users, i))
+        for i in range(iterations + 1)
+    ]
+    # recorded one time tokens are consumed when verified
+    one_time_tokens = [
+        AuthService.generate_one_time_verification_token(
+            user=pick(verify_users, i),
+            type=OneTimeTokenType.EMAIL_VERIFICATION.value,
+        )
+        for i in range(iterations + 1)
+    ]
+    factory = RequestFactory()
+    server_requests = [
+        factory.get(
+            "/api/test/",
+            HTTP_X_APP_NAME=app.app_name,
+            HTTP_X_SERVER_API_KEY=app.server_api_key,
+        )
+        for app in applications
+    ]
+    run_id = time.time_ns()
+
+    def server_key_auth(i: int) -> None:
+        request = pick(server_requests, i)
+        WakkaAppNameAuthentication().authenticate(request)
+        WakkaServerAuthentication().authenticate(request)
+
+    def verify_access_token(i: int) -> None:
+        JWTToken.verify_token(
+            token=access_tokens[i + 1], type=AuthTokenType.ACCESS_TOKEN
+        )
+
+    def create_user(i: int) -> None:
+        app = pick(applications, i)
+        AuthService.create_user(
+            email=f"new{run_id}.{i + 1}@{app.app_name}.example.com",
+            password=PASSWORD,
+            name="New User",
+            app=app,
+        )
+
+    return {
+        "AuthService.get_token_pair": (
+            lambda i: AuthService.get_token_pair(
+                email=pick(sample, i)[1], password=PASSWORD, app=pick(sample, i)[0]
+            ),
+            True,
+        ),
+        "AuthService.get_access_token": (
+            lambda i: AuthService.get_access_token(
+                refresh_token=pick(refresh_tokens, i)
+            ),
+            False,
+        ),
+        "JWTToken.obtain": (
+            lambda i: JWTToken.obtain_access_token_for_user(pick(sample_users, i)),
+            False,
+        ),
+        "JWTToken.verify_token": (verify_access_token, False),
+        "OneTimeJWTToken.obtain": (
+            lambda i: OneTimeJWTToken.obtain(
+                payload={
+                    "user_id": str(pick(sample_users, i).pk),
+                    "type": OneTimeTokenType.EMAIL_VERIFICATION.value,
+                },
+                user=pick(sample_users, i),
+            ),
+            False,
+        ),
+        "OneTimeJWTToken.verify": (
+            lambda i: OneTimeJWTToken.verify(
+                one_time_tokens[i + 1], user=pick(verify_users, i + 1)
+            ),
+            False,
+        ),
+        "server_key_auth": (server_key_auth, False),
+        "AuthService.create_user": (create_user, True),
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results: dict, baseline: dict = None) -> None:
+    columns = ["ops_per_second", "p50_ms", "p90_ms", "p99_ms", "max_ms"]
+    header = f"{'benchmark':<32}" + "".join(f"{column:>16}" for column in columns)
+    print(header + (f"{'change':>10}" if baseline else ""))
+    for name, result in results.items():
+        line = f"{name:<32}" + "".join(f"{result[column]:>16.3f}" for column in columns)
+        if baseline and name in baseline:
+            before = baseline[name]["ops_per_second"]
+            line += f"{(result['ops_per_second'] / before - 1) * 100:>+9.1f}%"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database", choices=["sqlite", "mysql"], default="sqlite")
+    parser.add_argument("--apps", type=int, default=10)
+    parser.add_argument("--users-per-app", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument(
+        "--hash-iterations",
+        type=int,
+        help="iterations of the paths which hash a password, default iterations/50",
+    )
+    parser.add_argument("--only", nargs="+", help="names of the benchmarks to run")
+    parser.add_argument("--output", type=Path, help="write the results as JSON")
+    parser.add_argument("--compare", type=Path, help="previous JSON result")
+    args = parser.parse_args()
+
+    setup_django(args.database)
+    from django.conf import settings
+
+    applications = seed(args.apps, args.users_per_app, args.database)
+    operations = benchmarks(applications, args.users_per_app, args.iterations)
+
+    hash_iterations = args.hash_iterations or max(1, args.iterations // 50)
+    results = {}
+    for name, (operation, hashes_password) in operations.items():
+        if args.only and name not in args.only:
+            continue
+        iterations = hash_iterations if hashes_password else args.iterations
+        results[name] = measure(operation, iterations)
+
+    baseline = None
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())["results"]
+    print_results(results, baseline)
+
+    if args.output:
+        report = {
+            "meta": {
+                "commit": git_commit(),
+                "time": datetime.now(tz=timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "database": settings.DATABASES["default"]["ENGINE"],
+                "apps": args.apps,
+                "users_per_app": args.users_per_app,
+                "jwt_algorithm": settings.JWT_SETTINGS["ALGORITHM"],
+                "password_hasher": settings.PASSWORD_HASHERS[0],
+            },
+            "results": results,
+        }
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"\nresults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
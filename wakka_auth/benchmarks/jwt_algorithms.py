@@ -0,0 +1,114 @@
+"""
+Sign and verify throughput of the JWT algorithms supported by Wakka Auth.
+
+Generates a throwaway key pair per algorithm and reports ops/sec for signing
+and verifying a token shaped like a wakka refresh token, both with parsed key
+objects (what `wakka.tokens` does) and with PEM strings parsed on every call.
+
+Usage: python benchmarks/jwt_algorithms.py [--iterations 1000]
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+
+ALGORITHMS = {
+    "RS256": lambda: rsa.generate_private_key(public_exponent=65537, key_size=2048),
+    "RS512": lambda: rsa.generate_private_key(public_exponent=65537, key_size=2048),
+    "ES256": lambda: ec.generate_private_key(ec.SECP256R1()),
+    "EdDSA": lambda: ed25519.Ed25519PrivateKey.generate(),
+}
+
+
+def generate_pem_key_pair(algorithm: str) -> tuple[str, str]:
+    private_key = ALGORITHMS[algorithm]()
+    private_pem = private_key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption(),
+    ).decode()
+    public_pem = (
+        private_key.public_key()
+        .public_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo,
+        )
+        .decode()
+    )
+    return private_pem, public_pem
+
+
+def sample_payload() -> dict:
+    now = datetime.now(tz=timezone.utc)
+    return {
+        "user_id": "0b8e5c0f-6f0e-4a8e-9d55-3cb0f1f7a9a1",
+        "name": "John Doe",
+        "email": "johndoe@example.com",
+        "app": "example_app",
+        "iss": "wakka-auth",
+        "jti": "5f1d7c3e0a9b4d2c8e6f4a2b0c9d8e7f",
+        "iat": now,
+        "exp": now + timedelta(days=5),
+        "type": "REFRESH_TOKEN",
+    }
+
+
+def ops_per_second(operation: Callable[[], object], iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        operation()
+    return iterations / (time.perf_counter() - start)
+
+
+def benchmark(algorithm: str, iterations: int) -> dict[str, float]:
+    private_pem, public_pem = generate_pem_key_pair(algorithm)
+    jwt_algorithm = jwt.get_algorithm_by_name(algorithm)
+    signing_key = jwt_algorithm.prepare_key(private_pem)
+    verifying_key = jwt_algorithm.prepare_key(public_pem)
+    payload = sample_payload()
+    token = jwt.encode(payload, signing_key, algorithm=algorithm)
+
+    return {
+        "sign": ops_per_second(
+            lambda: jwt.encode(payload, signing_key, algorithm=algorithm),
+            iterations,
+        ),
+        "verify": ops_per_second(
+            lambda: jwt.decode(token, verifying_key, algorithms=[algorithm]),
+            iterations,
+        ),
+        "sign_pem": ops_per_second(
+            lambda: jwt.encode(payload, private_pem, algorithm=algorithm),
+            iterations,
+        ),
+        "verify_pem": ops_per_second(
+            lambda: jwt.decode(token, public_pem, algorithms=[algorithm]),
+            iterations,
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--algorithms", nargs="+", default=list(ALGORITHMS))
+    args = parser.parse_args()
+
+    columns = ["sign", "verify", "sign_pem", "verify_pem"]
+    print(f"{'algorithm':<10}" + "".join(f"{column:>14}" for column in columns))
+    for algorithm in args.algorithms:
+        results = benchmark(algorithm, args.iterations)
+        print(
+            f"{algorithm:<10}"
+            + "".join(f"{results[column]:>14.0f}" for column in columns)
+        )
+    print("\nvalues are operations per second, *_pem parse the key on every call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+"""
+HTTP load test of a running Wakka Auth server.
+
+Drives `obtain-token/`, `refresh-token/`, `user/<id>/` and sign ups on
+`user/` with `--concurrency` keep-alive clients for `--duration` seconds,
+picking each request by the weights of `--mix`. Applications and users come
+from the manifest of `python manage.py generate_dataset`. Refresh tokens are
+primed with one login per client and refreshed from the tokens of the logins
+the run does.
+
+Prints the requests per second, the error rate and the latency histogram and
+percentiles of each endpoint, and with `--output` writes them as JSON.
+
+Usage: python benchmarks/load_test.py [--url http://127.0.0.1:8000]
+           [--manifest dataset.json] [--concurrency 16] [--duration 30]
+           [--mix obtain=40,refresh=40,user=15,signup=5] [--output load.json]
+"""
+
+import argparse
+import base64
+import bisect
+import http.client
+import json
+import random
+import statistics
+import threading
+import time
+from collections import defaultdict, deque
+from pathlib import Path
+from urllib.parse import urlsplit
+
+API_PATH = "/api/"
+# upper bounds of the latency histogram buckets, in milliseconds
+BUCKETS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+ENDPOINTS = ["obtain", "refresh", "user", "signup"]
+
+
+def parse_mix(value: str) -> dict:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"unknown endpoint {name}")
+        mix[name] = float(weight)
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError("the mix has no weight")
+    return mix
+
+
+def user_id_of(access_token: str) -> str:
+    """Reads the user id claim of a JWT without verifying it"""
+    payload = access_token.split(".")[1]
+    payload += "=" * (-len(payload) % 4)
+    return json.loads(base64.urlsafe_b64decode(payload))["user_id"]
+
+
+class Stats:
+    """Latencies and errors of one endpoint, shared by the clients"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.errors = defaultdict(int)
+
+    def record(self, latency_ms: float, error: str | None) -> None:
+        with self.lock:
+            self.latencies.append(latency_ms)
+            if error:
+                self.errors[error] += 1
+
+    def summary(self, duration: float) -> dict:
+        latencies = sorted(self.latencies)
+        requests = len(latencies)
+        errors = sum(self.errors.values())
+        summary = {
+            "requests": requests,
+            "rps": requests / duration,
+            "errors": errors,
+            "error_rate": errors / requests if requests else 0.0,
+            "errors_by_cause": dict(self.errors),
+            "histogram": {},
+        }
+        if not requests:
+            return summary
+        percentiles = (
+            statistics.quantiles(latencies, n=100, method="inclusive")
+            if requests > 1
+            else latencies * 99
+        )
+        summary.update(
+            mean_ms=statistics.fmean(latencies),
+            p50_ms=percentiles[49],
+            p90_ms=percentiles[89],
+            p99_ms=percentiles[98],
+            max_ms=latencies[-1],
+        )
+        previous = 0
+        for bound in [*BUCKETS_MS, float("inf")]:
+            count = bisect.bisect_right(latencies, bound)
+            label = f"<={bound}ms" if bound != float("inf") else f">{BUCKETS_MS[-1]}ms"
+            summary["histogram"][label] = count - previous
+            previous = count
+        return summary
+
+
+class Client(threading.Thread):
+    """One keep-alive connection sending requests until the deadline"""
+
+    def __init__(self, number: int, load_test: "LoadTest"):
+        super().__init__(name=f"client-{number}", daemon=True)
+        self.load_test = load_test
+        self.rng = random.Random(number)
+        self.connection = None
+
+    def connect(self) -> http.client.HTTPConnection:
+        if self.connection is None:
+            url = self.load_test.url
+            connection_class = (
+                http.client.HTTPSConnection
+                if url.scheme == "https"
+                else http.client.HTTPConnection
+            )
+            self.connection = connection_class(url.netloc, timeout=30)
+        return self.connection
+
+    def request(self, method: str, path: str, app: dict, body=None, server=False):
+        headers = {"X-App-Name": app["app_name"], "Content-Type": "application/json"}
+        if server:
+            headers["X-Server-Api-Key"] = app["server_api_key"]
+        try:
+            connection = self.connect()
+            connection.request(
+                method,
+                self.load_test.url.path.rstrip("/") + API_PATH + path,
+                body=json.dumps(body) if body is not None else None,
+                headers=headers,
+            )
+            response = connection.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException) as error:
+            # reconnect on the next request
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+            return None, type(error).__name__
+        if response.status >= 400:
+            return None, f"HTTP {response.status}"
+        return json.loads(data)["data"] if data else None, None
+
+    def obtain(self, app: dict) -> str | None:
+        user = self.rng.choice(app["users"])
+        data, error = self.request(
+            "POST",
+            "obtain-token/",
+            app,
+            {"email": user["email"], "password": self.load_test.password},
+        )
+        if data:
+            self.load_test.add_tokens(app, data)
+        return error
+
+    def refresh(self, app: dict) -> str | None:
+        refresh_token = self.load_test.refresh_token(app, self.rng)
+        if refresh_token is None:
+            return self.obtain(app)
+        _, error = self.request(
+            "POST", "refresh-token/", app, {"refresh_token": refresh_token}
+        )
+        return error
+
+    def user(self, app: dict) -> str | None:
+        _, error = self.request(
+            "GET", f"user/{self.rng.choice(app['users'])['id']}/", app, server=True
+        )
+        return error
+
+    def signup(self, app: dict) -> str | None:
+        email = f"signup.{time.time_ns()}.{self.rng.randrange(10**6)}@example.com"
+        _, error = self.request(
+            "POST",
+            "user/",
+            app,
+            {"email": email, "password": self.load_test.password, "name": "Load"},
+            server=True,
+        )
+        return error
+
+    def run(self):
+        endpoints, weights = zip(*self.load_test.mix.items())
+        while time.monotonic() < self.load_test.deadline:
+            endpoint = self.rng.choices(endpoints, weights)[0]
+            app = self.rng.choice(self.load_test.apps)
+            start = time.perf_counter()
+            error = getattr(self, endpoint)(app)
+            latency_ms = (time.perf_counter() - start) * 1000
+            if time.monotonic() < self.load_test.deadline:
+                self.load_test.stats[endpoint].record(latency_ms, error)
+        if self.connection is not None:
+            self.connection.close()
+
+
+class LoadTest:
+    def __init__(self, url: str, manifest: dict, mix: dict, concurrency: int):
+        self.url = urlsplit(url)
+        self.password = manifest["password"]
+        self.apps = [app for app in manifest["apps"] if app["users"]]
+        self.mix = {name: weight for name, weight in mix.items() if weight}
+        self.concurrency = concurrency
+        self.stats = {endpoint: Stats() for endpoint in self.mix}
+        # recent refresh tokens of each app
+        self.refresh_tokens = defaultdict(lambda: deque(maxlen=1000))
+        self.deadline = 0.0
+
+    def add_tokens(self, app: dict, data: dict) -> None:
+        self.refresh_tokens[app["app_name"]].append(data["refresh_token"])
+
+    def refresh_token(self, app: dict, rng: random.Random) -> str | None:
+        tokens = self.refresh_tokens[app["app_name"]]
+        return tokens[rng.randrange(len(tokens))] if tokens else None
+
+    def prime(self) -> None:
+        """One login per client, so the first refreshes have tokens"""
+        client = Client(-1, self)
+        for index in range(self.concurrency):
+            app = self.apps[index % len(self.apps)]
+            if error := client.obtain(app):
+                raise SystemExit(f"login of {app['app_name']} failed: {error}")
+        self.check_user_ids(client)
+
+    def check_user_ids(self, client: Client) -> None:
+        """The manifest users belong to their app, or `user` only sees 404"""
+        tokens = self.refresh_tokens[self.apps[0]["app_name"]]
+        user_ids = {user["id"] for user in self.apps[0]["users"]}
+        if tokens and user_id_of(tokens[-1]) not in user_ids:
+            raise SystemExit("the manifest does not match the server database")
+
+    def run(self, duration: float) -> float:
+        clients = [Client(number, self) for number in range(self.concurrency)]
+        start = time.monotonic()
+        self.deadline = start + duration
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+        return time.monotonic() - start
+
+
+def print_results(results: dict) -> None:
+    columns = ["requests", "rps", "error_rate", "p50_ms", "p90_ms", "p99_ms", "max_ms"]
+    print(f"{'endpoint':<10}" + "".join(f"{column:>12}" for column in columns))
+    for endpoint, summary in results.items():
+        print(
+            f"{endpoint:<10}"
+            + "".join(f"{summary.get(column, 0):>12.3f}" for column in columns)
+        )
+    for endpoint, summary in results.items():
+        print(f"\n{endpoint} latency histogram")
+        total = summary["requests"] or 1
+        for label, count in summary["histogram"].items():
+            bar = "#" * round(count / total * 50)
+            print(f"{label:>10} {count:>8} {bar}")
+        for cause, count in summary["errors_by_cause"].items():
+            print(f"{'error':>10} {count:>8} {cause}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--manifest", type=Path, default=Path("dataset.json"))
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument(
+        "--mix",
+        type=parse_mix,
+        default="obtain=40,refresh=40,user=15,signup=5",
+        help="relative weights of the endpoints",
+    )
+    parser.add_argument("--output", type=Path, help="write the results as JSON")
+    args = parser.parse_args()
+
+    load_test = LoadTest(
+        args.url, json.loads(args.manifest.read_text()), args.mix, args.concurrency
+    )
+    load_test.prime()
+    duration = load_test.run(args.duration)
+
+    results = {
+        endpoint: stats.summary(duration) for endpoint, stats in load_test.stats.items()
+    }
+    requests = sum(summary["requests"] for summary in results.values())
+    errors = sum(summary["errors"] for summary in results.values())
+    print(
+        f"{requests} requests in {duration:.1f}s with {args.concurrency} clients, "
+        f"{requests / duration:.1f} rps, {errors} errors\n"
+    )
+    print_results(results)
+
+    if args.output:
+        report = {
+            "meta": {
+                "url": args.url,
+                "concurrency": args.concurrency,
+                "duration": duration,
+                "mix": args.mix,
+            },
+            "results": results,
+        }
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"\nresults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
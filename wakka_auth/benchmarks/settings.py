@@ -0,0 +1,32 @@
+"""
+Settings for the benchmarks. Production settings on a seeded SQLite database,
+or on the MySQL database of the `WAKKA_DB_*` variables with
+`WAKKA_BENCHMARK_DATABASE=mysql`. Emails stay in memory.
+"""
+
+import os
+
+from config.settings import *  # noqa: F401, F403
+from config.settings import BASE_DIR, JWT_SETTINGS
+
+from benchmarks.jwt_algorithms import generate_pem_key_pair
+
+if os.environ.get("WAKKA_BENCHMARK_DATABASE", "sqlite") != "mysql":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.environ.get(
+                "WAKKA_BENCHMARK_SQLITE", BASE_DIR / "benchmarks" / "benchmark.sqlite3"
+            ),
+        }
+    }
+
+EMAIL_BACKEND = "django.core.mail.backends.locmem.EmailBackend"
+
+# key pair generated for the run, for the algorithm being benchmarked
+_signing_key, _verifying_key = generate_pem_key_pair(JWT_SETTINGS["ALGORITHM"])
+JWT_SETTINGS = {
+    **JWT_SETTINGS,
+    "SIGNING_KEY": _signing_key,
+    "VERIFYING_KEY": _verifying_key,
+}
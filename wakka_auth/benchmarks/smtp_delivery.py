@@ -0,0 +1,157 @@
+"""
+Email delivery throughput, one SMTP connection per email against the shared
+connection of the outbox worker.
+
+Starts a local `aiosmtpd` server, `pip install aiosmtpd`, and sends
+`--messages` emails twice: with `EmailMessage.send()`, which connects, greets
+and quits for every email as the requests used to, and with
+`EmailConnection.send_messages` in batches of `--batch-size`, as
+`send_outbox_emails` does. `--connect-delay` adds a delay to the greeting of
+each connection, standing in for the network round trips, TLS handshake and
+login of a remote SMTP server, `--message-delay` to each email.
+
+Usage: python benchmarks/smtp_delivery.py [--messages 500] [--batch-size 50]
+           [--connect-delay 50] [--message-delay 2] [--output smtp.json]
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import socket
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from auth_hot_paths import git_commit, setup_django
+
+
+class CountingHandler:
+    """aiosmtpd handler counting connections and delivered messages"""
+
+    def __init__(self, connect_delay: float, message_delay: float):
+        self.connect_delay = connect_delay
+        self.message_delay = message_delay
+        self.connections = 0
+        self.messages = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.connections += 1
+        await asyncio.sleep(self.connect_delay)
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        await asyncio.sleep(self.message_delay)
+        self.messages += 1
+        return "250 Message accepted for delivery"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def run(name: str, send, messages: list, handler: CountingHandler) -> dict:
+    handler.connections = handler.messages = 0
+    start = time.perf_counter()
+    send(messages)
+    elapsed = time.perf_counter() - start
+    result = {
+        "messages": handler.messages,
+        "connections": handler.connections,
+        "seconds": elapsed,
+        "messages_per_second": handler.messages / elapsed,
+    }
+    print(
+        f"{name:<12}{result['messages']:>10}{result['connections']:>13}"
+        f"{result['seconds']:>10.2f}{result['messages_per_second']:>16.1f}"
+    )
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--connect-delay", type=float, default=50, help="milliseconds")
+    parser.add_argument("--message-delay", type=float, default=2, help="milliseconds")
+    parser.add_argument("--output", type=Path, help="write the results as JSON")
+    args = parser.parse_args()
+
+    setup_django("sqlite")
+    from aiosmtpd.controller import Controller
+    from django.core.mail import EmailMessage
+    from django.test.utils import override_settings
+    from wakka.mail import EmailConnection
+
+    handler = CountingHandler(args.connect_delay / 1000, args.message_delay / 1000)
+    port = free_port()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+
+    messages = [
+        EmailMessage(
+            subject="Activate your account",
+            body=f"<p>Verify your email {i}</p>",
+            to=[f"user{i}@example.com"],
+        )
+        for i in range(args.messages)
+    ]
+    for message in messages:
+        message.content_subtype = "html"
+
+    def per_message(messages: list) -> None:
+        for message in messages:
+            message.send()
+
+    def pooled(messages: list) -> None:
+        for i in range(0, len(messages), args.batch_size):
+            errors = EmailConnection.send_messages(messages[i : i + args.batch_size])
+            assert not any(errors), errors
+        EmailConnection.close()
+
+    print(
+        f"{'delivery':<12}{'messages':>10}{'connections':>13}{'seconds':>10}"
+        f"{'messages/sec':>16}"
+    )
+    try:
+        with override_settings(
+            EMAIL_BACKEND="django.core.mail.backends.smtp.EmailBackend",
+            EMAIL_HOST="127.0.0.1",
+            EMAIL_PORT=port,
+            EMAIL_USE_TLS=False,
+            EMAIL_HOST_USER="",
+            EMAIL_HOST_PASSWORD="",
+        ):
+            results = {
+                "per_message": run("per_message", per_message, messages, handler),
+                "pooled": run("pooled", pooled, messages, handler),
+            }
+    finally:
+        controller.stop()
+    speedup = (
+        results["pooled"]["messages_per_second"]
+        / results["per_message"]["messages_per_second"]
+    )
+    print(f"\npooled delivery is {speedup:.1f}x faster")
+
+    if args.output:
+        report = {
+            "meta": {
+                "commit": git_commit(),
+                "time": datetime.now(tz=timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "batch_size": args.batch_size,
+                "connect_delay_ms": args.connect_delay,
+                "message_delay_ms": args.message_delay,
+            },
+            "results": results,
+        }
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"\nresults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
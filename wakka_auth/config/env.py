@@ -10,21 +10,45 @@ class BaseEnv:
     DB_PASS = "pass"
     DB_HOST = "localhost"
     DB_PORT = "3306"
+    DB_CONN_MAX_AGE = "60"
+    DB_CONN_HEALTH_CHECKS = "true"
+    DB_POOL = "false"
+    DB_POOL_MIN_SIZE = "1"
+    DB_POOL_MAX_SIZE = "10"
+    DB_POOL_IDLE_TIMEOUT = "300"
+    DB_POOL_WAIT_TIMEOUT = "5"
+    DB_REPLICA_HOSTS = ""
+    DB_REPLICA_STICKY_WINDOW = "10"
+
+    CACHE_LOCATION = ""
 
     SECRET_KEY = "secret_key"
     JWT_PRIVATE_KEY = "jwt_private_key"
     JWT_PUBLIC_KEY = "jwt_public_key"
+    JWT_ALGORITHM = "RS512"
 
     EMAIL_HOST = "smtp.gmail.com"
     EMAIL_FROM = "example@gmail.com"
     EMAIL_HOST_USER = "example@gmail.com"
     EMAIL_HOST_PASSWORD = "pass"
+    EMAIL_OUTBOX = "true"
 
     SINGLE_APP = "false"
     APP_NAME = "app"
 
     ADMIN_PORTAL_PATH = "admin"
 
+    ONE_TIME_TOKEN_STORE = "database"
+    ONE_TIME_TOKEN_SWEEP_INTERVAL = "3600"
+
+    ASGI = "false"
+
+    QUERY_BUDGET = "false"
+
+    RESPONSE_LOG = "false"
+    RESPONSE_LOG_LEVEL = "WARNING"
+    RESPONSE_LOG_SAMPLE_RATE = "1.0"
+
 
 class ENV(BaseEnv):
 
@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 import datetime
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 from .env import ENV
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -53,6 +55,7 @@ if DEBUG:
     ]
 
 MIDDLEWARE = [
+    "wakka.middleware.QueryBudgetMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -89,15 +92,75 @@ WSGI_APPLICATION = "config.wsgi.application"
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.mysql",
+        "ENGINE": (
+            "wakka.db.backends.mysql"
+            if ENV.DB_POOL == "true"
+            else "django.db.backends.mysql"
+        ),
         "NAME": ENV.DB_NAME,
         "USER": ENV.DB_USER,
         "PASSWORD": ENV.DB_PASS,
         "HOST": ENV.DB_HOST,
         "PORT": ENV.DB_PORT,
+        # pooled connections go back to the pool at the end of each request,
+        # persistent connections pile up under ASGI, a new thread per request
+        "CONN_MAX_AGE": (
+            0
+            if ENV.DB_POOL == "true" or ENV.ASGI == "true"
+            else int(ENV.DB_CONN_MAX_AGE)
+        ),
+        "CONN_HEALTH_CHECKS": ENV.DB_CONN_HEALTH_CHECKS == "true",
     }
 }
 
+# per-process connection pool used by `wakka.db.backends.mysql`
+DATABASE_POOL_SETTINGS = {
+    "MIN_SIZE": int(ENV.DB_POOL_MIN_SIZE),
+    "MAX_SIZE": int(ENV.DB_POOL_MAX_SIZE),
+    "IDLE_TIMEOUT": datetime.timedelta(seconds=int(ENV.DB_POOL_IDLE_TIMEOUT)),
+    # waiting longer for a free connection fails the request
+    "WAIT_TIMEOUT": datetime.timedelta(seconds=int(ENV.DB_POOL_WAIT_TIMEOUT)),
+    # connections idle for longer are pinged before reuse
+    "HEALTH_CHECK_AFTER": datetime.timedelta(seconds=1),
+}
+
+# read replicas as `host[:port]`, comma separated, sharing the primary credentials
+for index, replica in enumerate(filter(None, ENV.DB_REPLICA_HOSTS.split(","))):
+    host, _, port = replica.strip().partition(":")
+    DATABASES[f"replica_{index}"] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "PORT": port or ENV.DB_PORT,
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = ["wakka.routers.ReplicaRouter"]
+
+# memcached servers as `host:port`, comma separated, shared by the workers,
+# the per-process local memory cache without
+CACHES = {
+    "default": (
+        {
+            "BACKEND": "django.core.cache.backends.memcached.PyMemcacheCache",
+            "LOCATION": [
+                location.strip()
+                for location in ENV.CACHE_LOCATION.split(",")
+                if location.strip()
+            ],
+        }
+        if ENV.CACHE_LOCATION
+        else {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    )
+}
+
+DATABASE_REPLICA_SETTINGS = {
+    "REPLICAS": [alias for alias in DATABASES if alias != "default"],
+    # reads of rows written within this window go to the primary
+    "STICKY_WINDOW": datetime.timedelta(seconds=int(ENV.DB_REPLICA_STICKY_WINDOW)),
+    # Django cache holding the sticky keys, must be shared by the workers
+    "STICKY_CACHE": "default",
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -166,9 +229,19 @@ JWT_SETTINGS = {
     "ACCESS_TOKEN_LIFETIME": datetime.timedelta(minutes=10),
     "REFRESH_TOKEN_LIFETIME": datetime.timedelta(days=5),
     "ONE_TIME_TOKEN_LIFETIME": datetime.timedelta(minutes=30),
+    # `stateless` tokens are bound to the user state they change instead of
+    # a record, so issuing and verifying them writes nothing. `record` for
+    # a single use link regardless of the user state.
+    "ONE_TIME_TOKEN_MODES": {
+        "EMAIL_VERIFICATION": "stateless",
+        "FOROGT_PASSWORD": "stateless",
+    },
     "ISSUER": "wakka-uth",
+    # memory budget in bytes for the payloads of already verified tokens
+    "VERIFIED_TOKEN_CACHE_SIZE": 16 * 1024 * 1024,
     # Crypto settings
-    "ALGORITHM": "RS512",
+    # RS256, RS384, RS512, ES256 or EdDSA (Ed25519), matching the key pair
+    "ALGORITHM": ENV.JWT_ALGORITHM,
     "SIGNING_KEY": ENV.JWT_PRIVATE_KEY.replace("\\r", "")
     .replace("\\/", "/")
     .replace("\\n", "\n"),
@@ -177,6 +250,111 @@ JWT_SETTINGS = {
     .replace("\\n", "\n"),
 }
 
+# ------------------- APP REGISTRY SETTINGS -------------------
+# Process local cache of applications used to authenticate the app name header
+APP_REGISTRY_SETTINGS = {
+    "TTL": datetime.timedelta(seconds=60),
+    "MAX_ENTRIES": 1024,
+    # unknown app names are remembered to keep junk headers away from the
+    # database, a new app is missing in the other workers for up to this long
+    "NEGATIVE_TTL": datetime.timedelta(seconds=30),
+    "NEGATIVE_MAX_ENTRIES": 4096,
+}
+
+# ------------------- SERVER API KEY SETTINGS -------------------
+SERVER_API_KEY_SETTINGS = {
+    # recently verified server api keys are not hashed again within the TTL
+    "VERIFIED_CACHE_TTL": datetime.timedelta(seconds=60),
+    "VERIFIED_CACHE_MAX_ENTRIES": 1024,
+}
+
+# ------------------- PASSWORD HASHING SETTINGS -------------------
+PASSWORD_HASHING_SETTINGS = {
+    # hash passwords in a process pool instead of the request thread
+    "PROCESS_POOL": True,
+    "MAX_WORKERS": 2,
+    # hashing requests allowed to wait for a free process, the rest get a 503
+    "MAX_PENDING": 4,
+    "TIMEOUT": datetime.timedelta(seconds=5),
+    "RETRY_AFTER": datetime.timedelta(seconds=1),
+}
+
+# ------------------- LAST LOGIN SETTINGS -------------------
+LAST_LOGIN_SETTINGS = {
+    # buffer last logins in memory and write them in batches
+    "WRITE_BEHIND": True,
+    "FLUSH_INTERVAL": datetime.timedelta(seconds=30),
+    "FLUSH_SIZE": 500,
+    # skip the update if the last login is more recent than this
+    "MIN_RESOLUTION": datetime.timedelta(minutes=5),
+}
+
+# ------------------- ONE TIME TOKEN STORE SETTINGS -------------------
+ONE_TIME_TOKEN_STORES = {
+    "database": "wakka.stores.DatabaseTokenStore",
+    # in-process, a single worker only
+    "local": "wakka.stores.LocalTokenStore",
+    "cache": "wakka.stores.CacheTokenStore",
+}
+if ENV.ONE_TIME_TOKEN_STORE not in ONE_TIME_TOKEN_STORES:
+    raise ImproperlyConfigured(
+        f"WAKKA_ONE_TIME_TOKEN_STORE must be one of {', '.join(ONE_TIME_TOKEN_STORES)}"
+        f", not {ENV.ONE_TIME_TOKEN_STORE!r}"
+    )
+
+ONE_TIME_TOKEN_STORE_SETTINGS = {
+    "BACKEND": ONE_TIME_TOKEN_STORES[ENV.ONE_TIME_TOKEN_STORE],
+    # Django cache of the `cache` store, must be shared by the workers
+    "CACHE": "default",
+    "LOCAL_MAX_ENTRIES": 100000,
+}
+
+# ------------------- ONE TIME TOKEN SWEEPER SETTINGS -------------------
+ONE_TIME_TOKEN_SWEEPER_SETTINGS = {
+    # each worker sweeps expired records this often, 0 leaves it to the
+    # `sweep_one_time_tokens` command
+    "INTERVAL": datetime.timedelta(seconds=int(ENV.ONE_TIME_TOKEN_SWEEP_INTERVAL)),
+    "BATCH_SIZE": 1000,
+    # bounds the work of a periodic sweep, the rest is left for the next one
+    "MAX_BATCHES": 50,
+    "BATCH_PAUSE": datetime.timedelta(milliseconds=50),
+}
+
+# ------------------- HEALTH CHECK SETTINGS -------------------
+HEALTH_CHECK_SETTINGS = {
+    # readiness result is reused by the probes within this window
+    "CACHE_WINDOW": datetime.timedelta(seconds=5),
+    "DATABASE_TIMEOUT": datetime.timedelta(seconds=2),
+}
+
+# ------------------- QUERY BUDGET SETTINGS -------------------
+QUERY_BUDGET_SETTINGS = {
+    "ENABLED": ENV.QUERY_BUDGET == "true",
+    # fail the request instead of logging a warning, for the tests
+    "RAISE": False,
+    # queries allowed on the routes without a budget in `wakka.budgets`
+    "DEFAULT": 10,
+}
+
+# ------------------- RESPONSE LOG SETTINGS -------------------
+RESPONSE_LOG_SETTINGS = {
+    "ENABLED": ENV.RESPONSE_LOG == "true",
+    # successful responses are logged at DEBUG, errors at WARNING
+    "LEVEL": ENV.RESPONSE_LOG_LEVEL,
+    "SAMPLE_RATE": float(ENV.RESPONSE_LOG_SAMPLE_RATE),
+    # records beyond this many pending are dropped
+    "QUEUE_SIZE": 10000,
+    "REDACT_FIELDS": {
+        "access_token",
+        "refresh_token",
+        "token",
+        "password",
+        "new_password",
+        "confirm_password",
+        "server_api_key",
+    },
+}
+
 # ------------------- EMAILING SETTINGS -------------------
 
 EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
@@ -187,6 +365,25 @@ EMAIL_HOST_PASSWORD = ENV.EMAIL_HOST_PASSWORD
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
 
+EMAIL_OUTBOX_SETTINGS = {
+    # write emails to the outbox for the `send_outbox_emails` worker instead
+    # of sending them in the request
+    "ENABLED": ENV.EMAIL_OUTBOX == "true",
+    "BATCH_SIZE": 50,
+    "POLL_INTERVAL": datetime.timedelta(seconds=1),
+    # claimed emails are retried after this if the worker died
+    "CLAIM_TIMEOUT": datetime.timedelta(minutes=5),
+    "MAX_ATTEMPTS": 5,
+    "RETRY_BACKOFF": datetime.timedelta(seconds=30),
+    "RETRY_BACKOFF_MAX": datetime.timedelta(minutes=30),
+    # sent emails are deleted after this, failed ones are kept
+    "SENT_RETENTION": datetime.timedelta(days=7),
+    # the SMTP connection of a worker is renewed after this many messages,
+    # and closed when idle before the server drops it
+    "CONNECTION_MAX_MESSAGES": 500,
+    "CONNECTION_MAX_IDLE": datetime.timedelta(seconds=60),
+}
+
 
 # ------------------- CORS SETTINGS -------------------
 
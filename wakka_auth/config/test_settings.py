@@ -0,0 +1,71 @@
+"""
+Settings for the test suite, running on SQLite with the locmem email backend.
+
+python manage.py test --settings=config.test_settings
+"""
+
+import datetime
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from .settings import *  # noqa: F401, F403
+from .settings import (
+    BASE_DIR,
+    JWT_SETTINGS,
+    LAST_LOGIN_SETTINGS,
+    ONE_TIME_TOKEN_SWEEPER_SETTINGS,
+    PASSWORD_HASHING_SETTINGS,
+)
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "db.sqlite3",
+    },
+    # separate test database, only used by the tests of the replica router
+    "replica_0": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "replica_0.sqlite3",
+    },
+}
+
+EMAIL_BACKEND = "django.core.mail.backends.locmem.EmailBackend"
+
+# fast hasher, hashing inline instead of the process pool
+PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+PASSWORD_HASHING_SETTINGS = {
+    **PASSWORD_HASHING_SETTINGS,
+    "PROCESS_POOL": False,
+}
+
+# last logins are only flushed when a test asks for it
+LAST_LOGIN_SETTINGS = {
+    **LAST_LOGIN_SETTINGS,
+    "FLUSH_INTERVAL": datetime.timedelta(days=1),
+}
+
+# expired one time tokens are only swept when a test asks for it
+ONE_TIME_TOKEN_SWEEPER_SETTINGS = {
+    **ONE_TIME_TOKEN_SWEEPER_SETTINGS,
+    "INTERVAL": datetime.timedelta(0),
+    "BATCH_PAUSE": datetime.timedelta(0),
+}
+
+# key pair generated for the test run
+_private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+JWT_SETTINGS = {
+    **JWT_SETTINGS,
+    "ALGORITHM": "RS512",
+    "SIGNING_KEY": _private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode(),
+    "VERIFYING_KEY": _private_key.public_key()
+    .public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo,
+    )
+    .decode(),
+}
@@ -6,4 +6,9 @@ set -e
 python manage.py collectstatic --noinput
 python manage.py migrate
 
-python -m gunicorn config.wsgi:application --bind 0.0.0.0:8000 --workers 6 --log-level=debug
\ No newline at end of file
+if [ "$WAKKA_ASGI" = "true" ]; then
+    # async token and user views on uvicorn workers, see README
+    python -m gunicorn config.asgi:application --bind 0.0.0.0:8000 --workers 6 --worker-class uvicorn.workers.UvicornWorker --log-level=debug
+else
+    python -m gunicorn config.wsgi:application --bind 0.0.0.0:8000 --workers 6 --threads 4 --log-level=debug
+fi
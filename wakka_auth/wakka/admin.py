@@ -4,8 +4,9 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.db.models.query import QuerySet
 from django.http import HttpRequest
+from django.utils import timezone
 
-from .models import Application, User
+from .models import Application, OutboxEmail, User
 
 
 class CustomUserAdmin(UserAdmin):
@@ -91,5 +92,25 @@ class ApplicationAdmin(admin.ModelAdmin):
     )
 
 
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ("to", "subject", "status", "attempts", "created_at", "sent_at")
+    list_filter = ("status",)
+    search_fields = ("to",)
+    ordering = ("-created_at",)
+    readonly_fields = ("created_at", "sent_at", "last_error")
+    actions = ["retry"]
+
+    def retry(self, request: HttpRequest, queryset: QuerySet[OutboxEmail]):
+        count = queryset.exclude(status=OutboxEmail.Status.SENT).update(
+            status=OutboxEmail.Status.PENDING,
+            attempts=0,
+            next_attempt_at=timezone.now(),
+        )
+        self.message_user(request, f"{count} emails queued for delivery again.")
+
+    retry.short_description = "Retry the selected failed emails"
+
+
 admin.site.register(User, CustomUserAdmin)
 admin.site.register(Application, ApplicationAdmin)
+admin.site.register(OutboxEmail, OutboxEmailAdmin)
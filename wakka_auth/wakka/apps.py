@@ -1,6 +1,22 @@
+import atexit
+
 from django.apps import AppConfig
 
 
 class WakkaConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "wakka"
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .buffers import LastLoginBuffer
+        from .loggers import ResponseLogger
+        from .routers import ReplicaReads
+        from .tokens import OneTimeJWTToken
+
+        ReplicaReads.check_cache()
+        OneTimeJWTToken.store.check()
+
+        # write the buffered last logins when the worker exits
+        atexit.register(LastLoginBuffer.flush)
+        ResponseLogger.setup()
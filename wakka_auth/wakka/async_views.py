@@ -0,0 +1,106 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import HttpRequest, HttpResponse, JsonResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import APIException, ParseError
+
+from . import serializers
+from .authentication import WakkaAppNameAuthentication, WakkaServerAuthentication
+from .services import AuthService
+from .utils import WakkaJsonResponse
+
+"""
+Async variants of the token and user views, served instead of the DRF views
+when Wakka Auth runs on ASGI (`WAKKA_ASGI=true`). DRF views are sync only,
+so these are plain Django views reusing the serializers and services.
+"""
+
+
+def exception_response(exc: APIException) -> JsonResponse:
+    """Same response as `wakka_exception_handler` gives for the DRF views"""
+    data = exc.detail if isinstance(exc.detail, dict) else {"detail": exc.detail}
+    data["code"] = getattr(exc, "code", "ERROR")
+    headers = {}
+    if getattr(exc, "wait", None):
+        headers["Retry-After"] = "%d" % exc.wait
+    return JsonResponse(data, status=exc.status_code, headers=headers)
+
+
+class AsyncAPIView(View):
+    """Runs the async authentication classes and turns the API exceptions into
+    responses, like DRF's `APIView` does for the sync views."""
+
+    authentication_classes = []
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        try:
+            for authentication_class in self.authentication_classes:
+                await authentication_class().aauthenticate(request)
+            return await super().dispatch(request, *args, **kwargs)
+        except APIException as exc:
+            return exception_response(exc)
+
+    def get_data(self, request: HttpRequest) -> dict:
+        try:
+            return json.loads(request.body or b"{}")
+        except ValueError:
+            raise ParseError
+
+
+class TokenObtainPairView(AsyncAPIView):
+    authentication_classes = [WakkaAppNameAuthentication]
+
+    async def post(self, request: HttpRequest, *args, **kwargs):
+        serializer = serializers.TokenPairRequestSeralizer(data=self.get_data(request))
+        serializer.is_valid(raise_exception=True)
+        token_pair = await AuthService.aget_token_pair(
+            **serializer.validated_data, app=request.app
+        )
+        serializer = serializers.TokenPairResponseSerializer(token_pair)
+        return WakkaJsonResponse(serializer.data, status=status.HTTP_200_OK)
+
+
+class TokenRefreshView(AsyncAPIView):
+    authentication_classes = [WakkaAppNameAuthentication]
+
+    async def post(self, request: HttpRequest, *args, **kwargs):
+        serializer = serializers.TokenRefreshRequestSerializer(
+            data=self.get_data(request)
+        )
+        serializer.is_valid(raise_exception=True)
+        access_token = await AuthService.aget_access_token(**serializer.validated_data)
+        serializer = serializers.TokenRefreshResponseSerializer(access_token)
+        return WakkaJsonResponse(serializer.data, status=status.HTTP_200_OK)
+
+
+class UserDetailView(AsyncAPIView):
+    authentication_classes = [WakkaAppNameAuthentication, WakkaServerAuthentication]
+
+    async def get(self, request: HttpRequest, user_id: str, *args, **kwargs):
+        user = await AuthService.aget_user_by_id(user_id)
+        serializer = serializers.UserResponseSerializer(user)
+        return WakkaJsonResponse(serializer.data, status=status.HTTP_200_OK)
+
+    async def put(self, request: HttpRequest, user_id: str, *args, **kwargs):
+        serializer = serializers.UserUpdateRequestSerializer(
+            data=self.get_data(request)
+        )
+        serializer.is_valid(raise_exception=True)
+        data = await self._update_user(user_id, serializer.validated_data)
+        return WakkaJsonResponse(data, status=status.HTTP_200_OK)
+
+    async def delete(self, request: HttpRequest, user_id: str, *args, **kwargs):
+        await sync_to_async(AuthService.delete_user)(user_id)
+        return WakkaJsonResponse(status=status.HTTP_204_NO_CONTENT)
+
+    @sync_to_async
+    def _update_user(self, user_id: str, validated_data: dict) -> dict:
+        user = AuthService.update_user(user_id, **validated_data)
+        return serializers.UserResponseSerializer(user).data
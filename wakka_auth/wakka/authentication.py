@@ -1,10 +1,12 @@
+from asgiref.sync import sync_to_async
 from config.env import ENV
-from django.contrib.auth.hashers import check_password
 from django.http import HttpRequest
 from rest_framework.authentication import BaseAuthentication
 
+from .constants import DEFAULT_APP_NAME
 from .exceptions import InvalidAppNameException, InvalidServerApiKeyException
 from .models import Application
+from .registry import ApplicationRegistry
 
 """
 Preserve the order of includes in the views as 
@@ -20,13 +22,25 @@ class WakkaAppNameAuthentication(BaseAuthentication):
 
     def authenticate(self, request: HttpRequest):
         if ENV.SINGLE_APP == "true":
-            request.app_name = "default"
-            request.app, _ = Application.objects.get_or_create(
-                defaults={"title": ENV.APP_NAME}, app_name="default"
-            )
+            request.app_name = DEFAULT_APP_NAME
+            request.app = ApplicationRegistry.get_default()
             return None
         app_name = request.META.get("HTTP_X_APP_NAME")
-        app = Application.objects.filter(app_name=app_name).first()
+        app = ApplicationRegistry.get_by_app_name(app_name)
+        if app:
+            request.app_name = app_name
+            request.app = app
+            return None
+        raise InvalidAppNameException
+
+    async def aauthenticate(self, request: HttpRequest):
+        """Async variant of `authenticate` used by the async views"""
+        if ENV.SINGLE_APP == "true":
+            request.app_name = DEFAULT_APP_NAME
+            request.app = await ApplicationRegistry.aget_default()
+            return None
+        app_name = request.META.get("HTTP_X_APP_NAME")
+        app = await ApplicationRegistry.aget_by_app_name(app_name)
         if app:
             request.app_name = app_name
             request.app = app
@@ -48,7 +62,19 @@ class WakkaServerAuthentication(BaseAuthentication):
             raise InvalidAppNameException
         app: Application = request.app
         server_api_key = request.META.get("HTTP_X_SERVER_API_KEY")
-        server_api_key_hash = app.server_api_key_hash
-        if ENV.SINGLE_APP or check_password(server_api_key, server_api_key_hash):
+        if ENV.SINGLE_APP == "true" or app.check_server_api_key(server_api_key):
+            return None
+        raise InvalidServerApiKeyException
+
+    async def aauthenticate(self, request: HttpRequest):
+        """Async variant of `authenticate` used by the async views"""
+        if not hasattr(request, "app_name"):
+            raise InvalidAppNameException
+        app: Application = request.app
+        server_api_key = request.META.get("HTTP_X_SERVER_API_KEY")
+        if ENV.SINGLE_APP == "true":
+            return None
+        # a legacy hash is upgraded with a save, so leave the event loop
+        if await sync_to_async(app.check_server_api_key)(server_api_key):
             return None
         raise InvalidServerApiKeyException
@@ -0,0 +1,32 @@
+from typing import NamedTuple
+
+
+class Budget(NamedTuple):
+    queries: int
+    password_hashes: int
+    jwt_signs: int
+    jwt_verifies: int
+
+
+# The cost of each route by view name and method, with cold in-process caches,
+# the app lookup of the authentication classes included, stateless one time
+# tokens and the email outbox. `QueryBudgetMiddleware` checks the queries of
+# every request against it and the endpoint tests hold each route to all of
+# it, so any change must be deliberate.
+ENDPOINT_BUDGETS = {
+    ("api:health-live", "GET"): Budget(0, 0, 0, 0),
+    # SELECT 1, run in the health check thread
+    ("api:health-ready", "GET"): Budget(1, 0, 0, 0),
+    ("api:test", "GET"): Budget(1, 0, 0, 0),
+    ("api:user", "POST"): Budget(2, 1, 0, 0),
+    ("api:user-detail", "GET"): Budget(2, 0, 0, 0),
+    ("api:user-detail", "PUT"): Budget(3, 0, 0, 0),
+    ("api:user-detail", "DELETE"): Budget(3, 0, 0, 0),
+    ("api:obtain_token", "POST"): Budget(2, 1, 2, 0),
+    ("api:refresh_token", "POST"): Budget(2, 0, 1, 1),
+    ("api:send-verification-email", "POST"): Budget(3, 0, 1, 0),
+    ("api:send-forgot-password-email", "POST"): Budget(3, 0, 1, 0),
+    ("one-time:verify-email", "GET"): Budget(2, 0, 0, 1),
+    ("one-time:reset-password", "GET"): Budget(1, 0, 1, 1),
+    ("one-time:reset-password", "POST"): Budget(2, 1, 0, 1),
+}
@@ -0,0 +1,93 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+
+class LastLoginBuffer:
+    """Write-behind buffer for the `last_login` of users.
+
+    Instead of an UPDATE per login and refresh, the latest timestamp of each
+    user is kept in memory and written with a single `bulk_update` once
+    `FLUSH_SIZE` users are pending or `FLUSH_INTERVAL` has passed since the
+    first of them, by a timer thread, so an idle worker writes them too.
+    Pending timestamps are also flushed when the worker exits.
+    Logins within `MIN_RESOLUTION` of the previous one are not recorded.
+    """
+
+    _settings = settings.LAST_LOGIN_SETTINGS
+    _pending: dict = {}
+    _lock = threading.Lock()
+    _last_flush = time.monotonic()
+    # flushes the pending timestamps `FLUSH_INTERVAL` after the first of them
+    _timer: threading.Timer = None
+
+    @classmethod
+    def touch(cls, user: User) -> None:
+        """Record a login of the user now"""
+        now = timezone.now()
+        with cls._lock:
+            last_login = cls._pending.get(user.pk, user.last_login)
+        if last_login and now - last_login < cls._settings["MIN_RESOLUTION"]:
+            return
+        user.last_login = now
+
+        if not cls._settings["WRITE_BEHIND"]:
+            user.save(update_fields=["last_login"])
+            return
+
+        with cls._lock:
+            cls._pending[user.pk] = now
+            should_flush = (
+                len(cls._pending) >= cls._settings["FLUSH_SIZE"]
+                or time.monotonic() - cls._last_flush
+                >= cls._settings["FLUSH_INTERVAL"].total_seconds()
+            )
+            if not should_flush and cls._timer is None:
+                cls._timer = threading.Timer(
+                    cls._settings["FLUSH_INTERVAL"].total_seconds(),
+                    cls._flush_on_timer,
+                )
+                cls._timer.daemon = True
+                cls._timer.start()
+        if should_flush:
+            cls.flush()
+
+    @classmethod
+    def flush(cls) -> int:
+        """Write the pending timestamps, returns the number of users updated"""
+        with cls._lock:
+            pending, cls._pending = cls._pending, {}
+            cls._last_flush = time.monotonic()
+            if cls._timer is not None:
+                cls._timer.cancel()
+                cls._timer = None
+        if not pending:
+            return 0
+        users = [
+            User(pk=pk, last_login=last_login) for pk, last_login in pending.items()
+        ]
+        try:
+            User.objects.bulk_update(
+                users, ["last_login"], batch_size=cls._settings["FLUSH_SIZE"]
+            )
+        except Exception:
+            # last login is informational, losing a batch must not fail requests
+            logger.exception("Failed to flush last login of %d users", len(users))
+            return 0
+        return len(users)
+
+    @classmethod
+    def _flush_on_timer(cls) -> None:
+        try:
+            cls.flush()
+        finally:
+            # the connections of this thread are not closed by any request
+            connections.close_all()
@@ -0,0 +1,149 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+_MISSING = object()
+
+
+def is_shared_cache(alias: str) -> bool:
+    """Whether the Django cache `alias` is seen by every worker process"""
+    return not isinstance(caches[alias], (LocMemCache, DummyCache))
+
+
+class LRUCache:
+    """Thread safe, process local LRU cache with per entry expiry.
+
+    Entries are evicted in least recently used order once `max_entries` or
+    the total `cost` of the entries exceeds `max_cost`, and are treated as
+    missing once their expiry has passed. `get_or_load` guarantees that
+    concurrent misses for the same key call the loader only once
+    (stampede protection).
+    """
+
+    def __init__(
+        self, max_entries: int = 1024, ttl: float = None, max_cost: int = None
+    ):
+        self.max_entries = max_entries
+        self.max_cost = max_cost
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._cost = 0
+        self._entries: OrderedDict[Hashable, tuple[Any, float, int]] = OrderedDict()
+        self._lock = threading.RLock()
+        self._load_locks: dict[Hashable, threading.Lock] = {}
+        self._version = 0
+
+    def _expires_at(self, ttl: float = None) -> float:
+        ttl = self.ttl if ttl is None else ttl
+        return time.monotonic() + ttl if ttl is not None else float("inf")
+
+    def _pop(self, key: Hashable, last: bool = None) -> None:
+        if last is None:
+            _, _, cost = self._entries.pop(key)
+        else:
+            _, (_, _, cost) = self._entries.popitem(last=last)
+        self._cost -= cost
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        value = self._lookup(key)
+        with self._lock:
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return value
+
+    def _lookup(self, key: Hashable) -> Any:
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                return _MISSING
+            value, expires_at, _ = entry
+            if expires_at <= time.monotonic():
+                self._pop(key)
+                return _MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: float = None, cost: int = 1) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+            self._entries[key] = (value, self._expires_at(ttl), cost)
+            self._cost += cost
+            while self._entries and (
+                (self.max_entries is not None and len(self._entries) > self.max_entries)
+                or (self.max_cost is not None and self._cost > self.max_cost)
+            ):
+                self._pop(None, last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove the entry and return its value, `default` if it is missing
+        or expired. Only one of concurrent pops of a key gets the value."""
+        with self._lock:
+            value = self._lookup(key)
+            if value is _MISSING:
+                return default
+            self._pop(key)
+            return value
+
+    def clear(self) -> None:
+        """Drop every entry. Loads already in flight will not be stored."""
+        with self._lock:
+            self._entries.clear()
+            self._cost = 0
+            self._version += 1
+
+    def get_or_load(
+        self, key: Hashable, loader: Callable[[], Any], ttl: float = None
+    ) -> Any:
+        """Return the cached value for `key`, calling `loader` on a miss.
+        Only one thread loads a given key at a time, the others wait for it
+        and reuse the loaded value. `None` results are not cached."""
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        with load_lock:
+            # another thread may have loaded it meanwhile
+            value = self._lookup(key)
+            if value is not _MISSING:
+                return value
+            with self._lock:
+                version = self._version
+            try:
+                value = loader()
+            finally:
+                with self._lock:
+                    self._load_locks.pop(key, None)
+            with self._lock:
+                # skip storing if the cache was invalidated during the load
+                if value is not None and version == self._version:
+                    self.set(key, value, ttl)
+            return value
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "cost": self._cost,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
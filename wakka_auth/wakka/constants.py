@@ -1,5 +1,11 @@
 from enum import Enum
 
+# app name should always contain lowercase letters, numbers, and underscores
+APP_NAME_REGEX = "^[a-z0-9_]*$"
+APP_NAME_MAX_LENGTH = 40
+# app name of the only application in `SINGLE_APP` mode
+DEFAULT_APP_NAME = "default"
+
 
 class ErrorCode(Enum):
     INVALID_APP_NAME = "INVALID_APP_NAME"
@@ -16,6 +22,7 @@ class ErrorCode(Enum):
     FORGOT_PASSWORD_EMAIL_SENDING_FAILED = "FORGOT_PASSWORD_EMAIL_SENDING_FAILED"
     USER_NOT_ACTIVE = "USER_NOT_ACTIVE"
     EMAIL_ALREADY_VERIFIED = "EMAIL_ALREADY_VERIFIED"
+    PASSWORD_HASHING_UNAVAILABLE = "PASSWORD_HASHING_UNAVAILABLE"
 
 
 class OneTimeTokenType(Enum):
@@ -0,0 +1,73 @@
+from django.conf import settings
+from django.db.backends.mysql.base import Database
+from django.db.backends.mysql.base import DatabaseWrapper as MySQLDatabaseWrapper
+
+from ...pool import ConnectionPool, ConnectionPoolTimeout, ProcessLocalPools
+
+"""
+MySQL backend taking its connections from a per-process `ConnectionPool`.
+Closing the connection at the end of the request returns it to the pool
+instead of tearing it down, see `DATABASE_POOL_SETTINGS`.
+"""
+
+_pools = ProcessLocalPools()
+
+
+class DatabaseWrapper(MySQLDatabaseWrapper):
+    _settings = settings.DATABASE_POOL_SETTINGS
+
+    def get_pool(self, conn_params: dict) -> ConnectionPool:
+        return _pools.get_or_create(
+            self.alias,
+            lambda: ConnectionPool(
+                lambda: super(DatabaseWrapper, self).get_new_connection(conn_params),
+                min_size=self._settings["MIN_SIZE"],
+                max_size=self._settings["MAX_SIZE"],
+                idle_timeout=self._settings["IDLE_TIMEOUT"].total_seconds(),
+                wait_timeout=self._settings["WAIT_TIMEOUT"].total_seconds(),
+            ),
+        )
+
+    def get_new_connection(self, conn_params):
+        pool = self.get_pool(conn_params)
+        while True:
+            try:
+                connection, idle_for = pool.acquire()
+            except ConnectionPoolTimeout as e:
+                raise Database.OperationalError(str(e)) from e
+            if (
+                idle_for is None
+                or idle_for < self._settings["HEALTH_CHECK_AFTER"].total_seconds()
+            ):
+                break
+            try:
+                connection.ping()
+                break
+            except Database.Error:
+                pool.discard(connection)
+        # session variables set by `init_connection_state` survive in the pool
+        self._reused_connection = idle_for is not None
+        return connection
+
+    def init_connection_state(self):
+        if not self._reused_connection:
+            super().init_connection_state()
+
+    def _close(self):
+        if self.connection is None:
+            return
+        pool = _pools.get(self.alias)
+        if pool is None or self.errors_occurred or self.in_atomic_block:
+            # the connection may be broken or inside a transaction
+            if pool is not None:
+                pool.discard(self.connection)
+            else:
+                super()._close()
+            return
+        try:
+            if not self.autocommit:
+                self.connection.rollback()
+        except Database.Error:
+            pool.discard(self.connection)
+        else:
+            pool.release(self.connection)
@@ -0,0 +1,134 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable
+
+
+class ConnectionPoolTimeout(Exception):
+    """No connection was released to the pool within the wait timeout"""
+
+
+class ConnectionPool:
+    """Per-process pool of database connections.
+
+    At most `max_size` connections are open at a time, a checkout beyond that
+    waits up to `wait_timeout` seconds for one to be released. Idle
+    connections are closed after `idle_timeout` seconds, keeping `min_size`
+    of them open. Idle connections are reused most recently released first,
+    so the extra ones age out after a burst.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        min_size: int = 1,
+        max_size: int = 10,
+        idle_timeout: float = 300,
+        wait_timeout: float = 5,
+    ):
+        self.connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.wait_timeout = wait_timeout
+        # (connection, released at) pairs, most recently released last
+        self._idle = deque()
+        self._size = 0
+        self._condition = threading.Condition()
+
+    def acquire(self) -> tuple[Any, float]:
+        """Returns an open connection and the seconds it was idle for,
+        `None` for a new connection."""
+        deadline = time.monotonic() + self.wait_timeout
+        with self._condition:
+            while True:
+                self._close_idle()
+                if self._idle:
+                    connection, released_at = self._idle.pop()
+                    return connection, time.monotonic() - released_at
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._condition.wait(remaining):
+                    raise ConnectionPoolTimeout(
+                        "No database connection available within %ss"
+                        % self.wait_timeout
+                    )
+        try:
+            return self.connect(), None
+        except Exception:
+            self.discard()
+            raise
+
+    def release(self, connection: Any) -> None:
+        with self._condition:
+            self._idle.append((connection, time.monotonic()))
+            self._condition.notify()
+
+    def discard(self, connection: Any = None) -> None:
+        """Closes a broken connection and frees its slot"""
+        if connection is not None:
+            self._close(connection)
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+
+    def close_all(self) -> None:
+        with self._condition:
+            while self._idle:
+                connection, _ = self._idle.popleft()
+                self._close(connection)
+                self._size -= 1
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {"size": self._size, "idle": len(self._idle)}
+
+    def _close_idle(self) -> None:
+        expire_before = time.monotonic() - self.idle_timeout
+        while (
+            self._idle
+            and self._size > self.min_size
+            and self._idle[0][1] < expire_before
+        ):
+            connection, _ = self._idle.popleft()
+            self._close(connection)
+            self._size -= 1
+
+    @staticmethod
+    def _close(connection: Any) -> None:
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+class ProcessLocalPools:
+    """Pools by database alias, recreated in a forked process, which must not
+    share the connections of its parent."""
+
+    def __init__(self):
+        self._pools: dict[str, ConnectionPool] = {}
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def get(self, alias: str) -> ConnectionPool | None:
+        with self._lock:
+            self._check_pid()
+            return self._pools.get(alias)
+
+    def get_or_create(
+        self, alias: str, factory: Callable[[], ConnectionPool]
+    ) -> ConnectionPool:
+        with self._lock:
+            self._check_pid()
+            if alias not in self._pools:
+                self._pools[alias] = factory()
+            return self._pools[alias]
+
+    def _check_pid(self) -> None:
+        if self._pid != os.getpid():
+            self._pools = {}
+            self._pid = os.getpid()
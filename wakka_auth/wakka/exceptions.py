@@ -1,3 +1,4 @@
+from django.conf import settings
 from rest_framework import status
 from rest_framework.exceptions import APIException
 from rest_framework.views import exception_handler
@@ -144,4 +145,15 @@ class EmailAlreadyVerifiedException(BaseException):
     code = ErrorCode.EMAIL_ALREADY_VERIFIED.value
 
     def __init__(self):
-        super().__init__(self.message, self.status_code, self.code)
\ No newline at end of file
+        super().__init__(self.message, self.status_code, self.code)
+
+
+class PasswordHashingUnavailableException(BaseException):
+    message = "Too many requests are being processed, please retry later"
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    code = ErrorCode.PASSWORD_HASHING_UNAVAILABLE.value
+    # seconds, sent as the Retry-After header by the exception handler
+    wait = settings.PASSWORD_HASHING_SETTINGS["RETRY_AFTER"].total_seconds()
+
+    def __init__(self):
+        super().__init__(self.message, self.status_code, self.code)
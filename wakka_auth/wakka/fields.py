@@ -0,0 +1,28 @@
+from django.db import models
+
+
+class JTIField(models.BinaryField):
+    """The 16 bytes of a uuid `jti`, half the size of its hex string.
+
+    A `binary(16)` column on MySQL, where `BinaryField` is a `longblob`
+    which cannot be indexed without a prefix length.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs["max_length"] = 16
+        kwargs.setdefault("editable", False)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        del kwargs["max_length"]
+        return name, path, args, kwargs
+
+    def db_type(self, connection):
+        if connection.vendor == "mysql":
+            return "binary(16)"
+        return super().db_type(connection)
+
+    def from_db_value(self, value, expression, connection):
+        # memoryview on some backends
+        return bytes(value) if value is not None else None
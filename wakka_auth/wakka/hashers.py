@@ -0,0 +1,194 @@
+import asyncio
+import hashlib
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable
+
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    check_password,
+    get_hasher,
+    identify_hasher,
+    make_password,
+)
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+from .cache import LRUCache
+from .exceptions import PasswordHashingUnavailableException
+
+
+class ServerApiKeyHasher:
+    """Hashing and verification of application server api keys.
+
+    Server api keys are long random secrets, so a keyed HMAC-SHA256 of the key
+    is enough to store them, unlike user passwords which need a slow hasher.
+    Hashes made by the previous `make_password` scheme or with a secret of
+    `SECRET_KEY_FALLBACKS` are still accepted and upgraded through the
+    `setter` once the key is verified.
+    """
+
+    algorithm = "hmac_sha256"
+    key_salt = "wakka.hashers.ServerApiKeyHasher"
+    _settings = settings.SERVER_API_KEY_SETTINGS
+    # (hash, key digest) pairs verified recently
+    _verified = LRUCache(
+        max_entries=_settings["VERIFIED_CACHE_MAX_ENTRIES"],
+        ttl=_settings["VERIFIED_CACHE_TTL"].total_seconds(),
+    )
+
+    @classmethod
+    def _digest(cls, server_api_key: str, secret: str = None) -> str:
+        return salted_hmac(
+            cls.key_salt, server_api_key, secret=secret, algorithm="sha256"
+        ).hexdigest()
+
+    @classmethod
+    def make(cls, server_api_key: str) -> str:
+        """Hash the server api key as `hmac_sha256$<hex digest>`"""
+        return f"{cls.algorithm}${cls._digest(server_api_key)}"
+
+    @classmethod
+    def verify(
+        cls,
+        server_api_key: str,
+        encoded: str,
+        setter: Callable[[str], None] = None,
+    ) -> bool:
+        """Check the server api key against the hash in constant time."""
+        if not server_api_key or not encoded:
+            return False
+        cache_key = (encoded, hashlib.sha256(server_api_key.encode()).digest())
+        if cls._verified.get(cache_key):
+            return True
+
+        algorithm, _, digest = encoded.partition("$")
+        if algorithm == cls.algorithm:
+            is_correct = constant_time_compare(digest, cls._digest(server_api_key))
+            if not is_correct:
+                # keys hashed before rotating the SECRET_KEY are still valid,
+                # rehash them before the fallback is removed
+                is_correct = any(
+                    constant_time_compare(digest, cls._digest(server_api_key, secret))
+                    for secret in settings.SECRET_KEY_FALLBACKS
+                )
+                if is_correct and setter:
+                    setter(server_api_key)
+        else:
+            # legacy hash made with `make_password`, upgrade it once verified
+            is_correct = check_password(server_api_key, encoded)
+            if is_correct and setter:
+                setter(server_api_key)
+
+        if is_correct:
+            cls._verified.set(cache_key, True)
+        return is_correct
+
+
+def _verify_password(password: str, encoded: str) -> tuple[bool, bool]:
+    """Runs in the hashing process. Returns whether the password is correct
+    and whether the hash must be upgraded to the preferred hasher."""
+    is_correct = check_password(password, encoded)
+    if not is_correct:
+        return False, False
+    preferred = get_hasher("default")
+    hasher = identify_hasher(encoded)
+    must_update = hasher.algorithm != preferred.algorithm or preferred.must_update(
+        encoded
+    )
+    return True, must_update
+
+
+class PasswordHashingExecutor:
+    """Runs the slow password hashing in a bounded process pool.
+
+    The request thread waits for the result without holding the GIL, so a
+    burst of logins cannot starve the other requests of the worker. At most
+    `MAX_WORKERS` hashes run at a time and `MAX_PENDING` more may wait;
+    beyond that the request fails fast with a 503 and `Retry-After`.
+    With `PROCESS_POOL` disabled the hashing runs inline.
+    """
+
+    _settings = settings.PASSWORD_HASHING_SETTINGS
+    _executor: ProcessPoolExecutor = None
+    _executor_lock = threading.Lock()
+    _slots = threading.BoundedSemaphore(
+        _settings["MAX_WORKERS"] + _settings["MAX_PENDING"]
+    )
+
+    @classmethod
+    def _get_executor(cls) -> ProcessPoolExecutor:
+        with cls._executor_lock:
+            if cls._executor is None:
+                # spawn, forking a worker with running threads is not safe
+                cls._executor = ProcessPoolExecutor(
+                    max_workers=cls._settings["MAX_WORKERS"],
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return cls._executor
+
+    @classmethod
+    def _submit(cls, function: Callable, *args) -> Future:
+        if not cls._slots.acquire(blocking=False):
+            raise PasswordHashingUnavailableException
+        try:
+            future: Future = cls._get_executor().submit(function, *args)
+        except Exception:
+            cls._slots.release()
+            raise
+        future.add_done_callback(lambda _: cls._slots.release())
+        return future
+
+    @classmethod
+    def _run(cls, function: Callable, *args) -> Any:
+        if not cls._settings["PROCESS_POOL"]:
+            return function(*args)
+        future = cls._submit(function, *args)
+        try:
+            return future.result(timeout=cls._settings["TIMEOUT"].total_seconds())
+        except FutureTimeoutError:
+            raise PasswordHashingUnavailableException
+
+    @classmethod
+    async def _arun(cls, function: Callable, *args) -> Any:
+        if not cls._settings["PROCESS_POOL"]:
+            return await asyncio.to_thread(function, *args)
+        future = cls._submit(function, *args)
+        try:
+            return await asyncio.wait_for(
+                asyncio.wrap_future(future),
+                timeout=cls._settings["TIMEOUT"].total_seconds(),
+            )
+        except asyncio.TimeoutError:
+            raise PasswordHashingUnavailableException
+
+    @classmethod
+    def make_password(cls, password: str) -> str:
+        return cls._run(make_password, password)
+
+    @classmethod
+    def set_password(cls, user, password: str) -> None:
+        """Same as `user.set_password`, hashing in the pool. Saving the user
+        runs the password validators' `password_changed` hooks."""
+        user.password = cls.make_password(password)
+        user._password = password
+
+    @classmethod
+    def check_password(cls, user, password: str) -> bool:
+        """Same as `user.check_password`, upgrades the hash if needed"""
+        is_correct, must_update = cls._run(_verify_password, password, user.password)
+        if must_update:
+            user.password = cls.make_password(password)
+            user.save(update_fields=["password"])
+        return is_correct
+
+    @classmethod
+    async def acheck_password(cls, user, password: str) -> bool:
+        is_correct, must_update = await cls._arun(
+            _verify_password, password, user.password
+        )
+        if must_update:
+            user.password = await cls._arun(make_password, password)
+            await user.asave(update_fields=["password"])
+        return is_correct
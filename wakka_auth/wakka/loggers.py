@@ -0,0 +1,97 @@
+import atexit
+import json
+import logging
+import queue
+import random
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any
+
+from django.conf import settings
+
+REDACTED = "[REDACTED]"
+
+
+class JSONFormatter(logging.Formatter):
+    """Formats the record as a single line JSON object"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps(
+            {
+                "time": self.formatTime(record),
+                "level": record.levelname,
+                "logger": record.name,
+                "message": record.getMessage(),
+                **getattr(record, "payload", {}),
+            },
+            default=str,
+        )
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Queue handler which drops the record when the queue is full,
+    logging must never block or fail the request."""
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+
+class ResponseLogger:
+    """Structured, sampled logging of the responses sent by `WakkaResponse`.
+
+    Successful responses are logged at DEBUG and errors at WARNING, gated by
+    the `LEVEL` setting and sampled with `SAMPLE_RATE`. Token and password
+    fields are redacted. Records are handed to a background thread through a
+    bounded queue, so the request never waits on the log stream.
+    """
+
+    _settings = settings.RESPONSE_LOG_SETTINGS
+    _logger = logging.getLogger("wakka.response")
+    _listener: QueueListener = None
+
+    @classmethod
+    def setup(cls) -> None:
+        if not cls._settings["ENABLED"] or cls._listener:
+            return
+        log_queue = queue.Queue(maxsize=cls._settings["QUEUE_SIZE"])
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(JSONFormatter())
+        cls._listener = QueueListener(log_queue, stream_handler)
+        cls._listener.start()
+        atexit.register(cls._listener.stop)
+
+        cls._logger.addHandler(DroppingQueueHandler(log_queue))
+        cls._logger.setLevel(cls._settings["LEVEL"])
+        cls._logger.propagate = False
+
+    @classmethod
+    def log(cls, data: Any, status: int) -> None:
+        if not cls._settings["ENABLED"]:
+            return
+        level = logging.WARNING if status >= 400 else logging.DEBUG
+        if not cls._logger.isEnabledFor(level):
+            return
+        if random.random() >= cls._settings["SAMPLE_RATE"]:
+            return
+        cls._logger.log(
+            level,
+            "response",
+            extra={"payload": {"status": status, "data": cls.redact(data)}},
+        )
+
+    @classmethod
+    def redact(cls, data: Any) -> Any:
+        if isinstance(data, dict):
+            return {
+                key: (
+                    REDACTED
+                    if key in cls._settings["REDACT_FIELDS"]
+                    else cls.redact(value)
+                )
+                for key, value in data.items()
+            }
+        if isinstance(data, (list, tuple)):
+            return [cls.redact(value) for value in data]
+        return data
@@ -0,0 +1,121 @@
+import logging
+import os
+import smtplib
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+
+logger = logging.getLogger(__name__)
+
+# errors of the connection, the message is sent again over a new connection
+CONNECTION_ERRORS = (
+    smtplib.SMTPServerDisconnected,
+    smtplib.SMTPConnectError,
+    ConnectionError,
+    socket.timeout,
+)
+
+# the server refused the message, the connection is still usable
+REFUSED_ERRORS = (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused)
+
+
+class EmailConnection:
+    """One long-lived, authenticated connection of the email backend per
+    process, shared by the batches of the outbox worker.
+
+    The connect, TLS handshake and login are paid once instead of once per
+    email. A message failing on a broken connection, e.g. closed by the server
+    while idle, is sent again once over a new connection. The connection is
+    renewed after `CONNECTION_MAX_MESSAGES` messages, the limit of some SMTP
+    providers, and closed once idle for `CONNECTION_MAX_IDLE`.
+    """
+
+    _settings = settings.EMAIL_OUTBOX_SETTINGS
+    _lock = threading.Lock()
+    _backend = None
+    _pid = None
+    _sent = 0
+    _last_used = 0.0
+
+    @classmethod
+    def send_messages(cls, messages: list[EmailMessage]) -> list[Exception | None]:
+        """Send the messages over the shared connection, returns the error of
+        each message, `None` once sent"""
+        with cls._lock:
+            return [cls._send(message) for message in messages]
+
+    @classmethod
+    def _send(cls, message: EmailMessage) -> Exception | None:
+        for attempt in range(2):
+            try:
+                backend = cls._open()
+                # the backend keeps a connection it did not open itself
+                backend.send_messages([message])
+                cls._sent += 1
+                cls._last_used = time.monotonic()
+                return None
+            except CONNECTION_ERRORS as e:
+                cls._reset()
+                if attempt:
+                    return e
+                logger.info("Email connection lost, reconnecting: %s", e)
+            except REFUSED_ERRORS as e:
+                return e
+            except Exception as e:
+                # the state of the connection is unknown, it is not reused
+                cls._reset()
+                return e
+
+    @classmethod
+    def _open(cls):
+        if cls._pid != os.getpid():
+            # a forked process must not write to the socket of its parent
+            cls._backend = None
+            cls._pid = os.getpid()
+        if cls._backend is not None and (
+            cls._sent >= cls._settings["CONNECTION_MAX_MESSAGES"]
+            or time.monotonic() - cls._last_used
+            > cls._settings["CONNECTION_MAX_IDLE"].total_seconds()
+        ):
+            cls._reset()
+        if cls._backend is None:
+            backend = get_connection()
+            try:
+                backend.open()
+            except Exception:
+                # e.g. the login failed on an open socket
+                backend.close()
+                raise
+            cls._backend = backend
+            cls._sent = 0
+            cls._last_used = time.monotonic()
+        return cls._backend
+
+    @classmethod
+    def _reset(cls) -> None:
+        backend, cls._backend = cls._backend, None
+        if backend is None:
+            return
+        try:
+            backend.close()
+        except Exception:
+            pass
+
+    @classmethod
+    def close(cls) -> None:
+        with cls._lock:
+            cls._reset()
+
+    @classmethod
+    def close_if_idle(cls) -> None:
+        """Close the connection once idle for `CONNECTION_MAX_IDLE`, before
+        the server drops it"""
+        with cls._lock:
+            if (
+                time.monotonic() - cls._last_used
+                > cls._settings["CONNECTION_MAX_IDLE"].total_seconds()
+            ):
+                cls._reset()
@@ -0,0 +1,215 @@
+import itertools
+import json
+import random
+from datetime import timedelta
+from pathlib import Path
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from wakka.hashers import PasswordHashingExecutor
+from wakka.models import Application, OnetimeTokenRecords, User
+
+FIRST_NAMES = [
+    "james", "mary", "john", "patricia", "robert", "jennifer", "michael",
+    "linda", "william", "elizabeth", "david", "barbara", "richard", "susan",
+    "joseph", "jessica", "thomas", "sarah", "carlos", "maria", "wei", "priya",
+    "mohammed", "fatima", "hiroshi", "yuki", "olga", "ivan", "ana", "lucas",
+]  # fmt: skip
+LAST_NAMES = [
+    "smith", "johnson", "williams", "brown", "jones", "garcia", "miller",
+    "davis", "rodriguez", "martinez", "hernandez", "lopez", "wilson", "anderson",
+    "thomas", "taylor", "moore", "jackson", "martin", "lee", "kumar", "singh",
+    "chen", "wang", "tanaka", "sato", "ivanova", "silva", "santos", "muller",
+]  # fmt: skip
+# (domain, weight), a few large providers and a long tail of company domains
+EMAIL_DOMAINS = [
+    ("gmail.com", 40),
+    ("yahoo.com", 10),
+    ("outlook.com", 10),
+    ("hotmail.com", 8),
+    ("icloud.com", 6),
+    ("proton.me", 2),
+    *((f"company{index}.com", 0.25) for index in range(96)),
+]
+EMAIL_FORMATS = [
+    ("{first}.{last}{n}", 45),
+    ("{first}{last}{n}", 20),
+    ("{first}_{n}", 15),
+    ("{f}{last}{n}", 15),
+    ("{first}.{last}+{tag}{n}", 5),
+]
+
+
+class Reservoir:
+    """Uniform sample of `size` items of a stream of unknown length"""
+
+    def __init__(self, size: int, rng: random.Random):
+        self.size = size
+        self.rng = rng
+        self.items = []
+        self.seen = 0
+
+    def add(self, item) -> None:
+        self.seen += 1
+        if len(self.items) < self.size:
+            self.items.append(item)
+            return
+        index = self.rng.randrange(self.seen)
+        if index < self.size:
+            self.items[index] = item
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates a synthetic multi-tenant dataset with bulk inserts: "
+        "applications, their users (some soft deleted or not verified) and "
+        "pending one time tokens. Writes a manifest with the server api keys "
+        "and sample users for the load test harness."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--apps", type=int, default=10)
+        parser.add_argument("--users-per-app", type=int, default=10000)
+        parser.add_argument("--prefix", default="load", help="app name prefix")
+        parser.add_argument("--password", default="L0ad!test-password")
+        parser.add_argument("--soft-deleted-ratio", type=float, default=0.05)
+        parser.add_argument("--unverified-ratio", type=float, default=0.1)
+        parser.add_argument(
+            "--pending-tokens-ratio",
+            type=float,
+            default=0.02,
+            help="one time tokens pending per user",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--manifest", type=Path, default=Path("dataset.json"))
+        parser.add_argument(
+            "--sample-users",
+            type=int,
+            default=1000,
+            help="verified users per app listed in the manifest",
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        if (
+            Application.objects.include_deleted()
+            .filter(app_name__startswith=f"{options['prefix']}_")
+            .exists()
+        ):
+            raise CommandError(
+                f"Applications prefixed {options['prefix']}_ exist, use another --prefix"
+            )
+
+        # all users share one password hash, hashing millions is not feasible
+        password_hash = PasswordHashingExecutor.make_password(options["password"])
+        manifest = {"password": options["password"], "apps": []}
+        for index in range(options["apps"]):
+            app = Application(
+                app_name=f"{options['prefix']}_{index}",
+                title=f"Load test {index}",
+            )
+            app.generate_server_api_key()
+            sample = self.create_users(app, password_hash, rng, options)
+            manifest["apps"].append(
+                {
+                    "app_name": app.app_name,
+                    "server_api_key": app.server_api_key,
+                    "users": sample,
+                }
+            )
+            self.stdout.write(f"{app.app_name}: {options['users_per_app']} users")
+
+        tokens = self.create_one_time_tokens(
+            int(
+                options["apps"]
+                * options["users_per_app"]
+                * options["pending_tokens_ratio"]
+            ),
+            options["batch_size"],
+            rng,
+        )
+        self.stdout.write(f"{tokens} pending one time tokens")
+
+        options["manifest"].write_text(json.dumps(manifest, indent=2))
+        self.stdout.write(
+            self.style.SUCCESS(f"Manifest written to {options['manifest']}")
+        )
+
+    def create_users(self, app: Application, password_hash: str, rng, options) -> list:
+        """Bulk inserts the users of the app, returns a sample of the
+        verified ones as `{"id", "email"}`"""
+        now = timezone.now()
+        domains, domain_weights = zip(*EMAIL_DOMAINS)
+        formats, format_weights = zip(*EMAIL_FORMATS)
+        sample = Reservoir(options["sample_users"], rng)
+        users = (
+            self.build_user(
+                app,
+                number,
+                password_hash,
+                rng.choices(formats, format_weights)[0],
+                rng.choices(domains, domain_weights)[0],
+                rng,
+                now,
+                options,
+            )
+            for number in range(options["users_per_app"])
+        )
+        while batch := list(itertools.islice(users, options["batch_size"])):
+            with transaction.atomic():
+                User.objects.bulk_create(batch)
+            for user in batch:
+                if user.verified and not user.deleted_at:
+                    sample.add({"id": str(user.pk), "email": user.email})
+        return sample.items
+
+    def build_user(
+        self, app, number, password_hash, email_format, domain, rng, now, options
+    ) -> User:
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        # the number keeps the emails unique within the app
+        local_part = email_format.format(
+            first=first, last=last, f=first[0], n=number, tag=rng.choice("abcxyz")
+        )
+        email = f"{local_part}@{domain}"
+        username = f"{app.app_name}$${email}".lower()
+        user = User(
+            email=email,
+            username=username,
+            name=f"{first.title()} {last.title()}",
+            password=password_hash,
+            app=app,
+            verified=True,
+            is_active=True,
+        )
+        draw = rng.random()
+        if draw < options["soft_deleted_ratio"]:
+            user.username = f"{username}$$deleted"
+            user.deleted_at = now - timedelta(days=rng.expovariate(1 / 90))
+            user.is_active = False
+        elif draw < options["soft_deleted_ratio"] + options["unverified_ratio"]:
+            user.verified = False
+            user.is_active = False
+        else:
+            # the last login of active users is recent
+            user.last_login = now - timedelta(hours=rng.expovariate(1 / 72))
+        return user
+
+    def create_one_time_tokens(self, count: int, batch_size: int, rng) -> int:
+        lifetime = settings.JWT_SETTINGS["ONE_TIME_TOKEN_LIFETIME"]
+        now = timezone.now()
+        tokens = (
+            OnetimeTokenRecords(
+                jti=uuid4().bytes, expires_at=now + lifetime * rng.random()
+            )
+            for _ in range(count)
+        )
+        while batch := list(itertools.islice(tokens, batch_size)):
+            with transaction.atomic():
+                OnetimeTokenRecords.objects.bulk_create(batch)
+        return count
@@ -0,0 +1,61 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from wakka.mail import EmailConnection
+from wakka.outbox import EmailOutbox
+
+
+class Command(BaseCommand):
+    help = (
+        "Delivers the emails of the outbox until stopped. Run any number of "
+        "workers, each claims its own batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, help="emails per claim")
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            help="seconds to wait when no email is due",
+        )
+        parser.add_argument(
+            "--once", action="store_true", help="exit once no email is due"
+        )
+
+    def handle(self, *args, **options):
+        poll_interval = (
+            options["poll_interval"]
+            or EmailOutbox._settings["POLL_INTERVAL"].total_seconds()
+        )
+        self.running = True
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        total_sent = total_failed = 0
+        while self.running:
+            close_old_connections()
+            sent, failed = EmailOutbox.deliver(options["batch_size"])
+            total_sent += sent
+            total_failed += failed
+            if sent or failed:
+                self.stdout.write(f"Sent {sent} emails, {failed} failed")
+                continue
+            # idle, clean up before waiting for new emails
+            EmailOutbox.purge_sent()
+            EmailConnection.close_if_idle()
+            if options["once"]:
+                break
+            time.sleep(poll_interval)
+        EmailConnection.close()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Stopped, sent {total_sent} emails, {total_failed} failed"
+            )
+        )
+
+    def stop(self, signum, frame):
+        # finish the batch in flight, its emails are marked sent or failed
+        self.running = False
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from wakka.sweepers import OneTimeTokenSweeper
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes the expired one time token records in batches, "
+        "e.g. from a cron job when the periodic sweep of the workers is off."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, help="records per DELETE")
+        parser.add_argument(
+            "--max-batches", type=int, help="stop after this many batches"
+        )
+        parser.add_argument(
+            "--pause", type=float, help="seconds to wait between batches"
+        )
+
+    def handle(self, *args, **options):
+        deleted = OneTimeTokenSweeper.sweep(
+            batch_size=options["batch_size"],
+            max_batches=options["max_batches"],
+            pause=options["pause"],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Deleted {deleted} expired one time token records")
+        )
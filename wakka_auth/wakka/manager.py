@@ -3,6 +3,8 @@ from django.db import models
 from django.db.models.query import QuerySet
 from django.utils import timezone
 
+from .hashers import PasswordHashingExecutor
+
 
 class SoftDeleteQuerySet(QuerySet):
     """Custom QuerySet to enable soft delete objects."""
@@ -28,12 +30,17 @@ class UserManager(BaseUserManager):
     "Custom User Model Manager implementing SoftDeleteQuerySet."
 
     def create_user(self, email, password=None, **extra_fields):
+        user = self.build_user(email, password, **extra_fields)
+        user.save(using=self._db)
+        return user
+
+    def build_user(self, email, password=None, **extra_fields):
+        """Unsaved user with the hashed password"""
         if not email:
             raise ValueError("The Email field must be set")
         email = self.normalize_email(email)
         user = self.model(email=email, **extra_fields)
-        user.set_password(password)
-        user.save(using=self._db)
+        PasswordHashingExecutor.set_password(user, password)
         return user
 
     def create_superuser(self, email, password, **extra_fields):
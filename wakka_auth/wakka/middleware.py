@@ -1 +1,101 @@
-# Add middlewares here
\ No newline at end of file
+import logging
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpRequest, HttpResponse
+
+from .budgets import ENDPOINT_BUDGETS
+
+logger = logging.getLogger("wakka.query_budget")
+
+# queries run by the current request, `None` outside of a request
+_query_count: ContextVar[list[int] | None] = ContextVar(
+    "wakka_query_count", default=None
+)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def count_query(execute, sql, params, many, context):
+    count = _query_count.get()
+    if count is not None:
+        count[0] += 1
+    return execute(sql, params, many, context)
+
+
+def install_query_counter(sender, connection, **kwargs):
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_query)
+
+
+class QueryBudgetMiddleware:
+    """Counts the queries of each request against the budget of its route.
+
+    Budgets are the queries of `ENDPOINT_BUDGETS`, keyed by the view name and
+    method, e.g. `("api:obtain_token", "POST")`, and routes without one get
+    the `DEFAULT` budget. A request over budget is logged,
+    or fails with `QueryBudgetExceeded` when `RAISE` is set, as in the tests.
+    The count is sent in the `X-Query-Count` header.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.settings = settings.QUERY_BUDGET_SETTINGS
+        if not self.settings["ENABLED"]:
+            raise MiddlewareNotUsed
+        # connections opened from now on are instrumented by the receiver
+        connection_created.connect(install_query_counter)
+        for connection in connections.all(initialized_only=True):
+            install_query_counter(None, connection)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        count = [0]
+        token = _query_count.set(count)
+        try:
+            response = self.get_response(request)
+        finally:
+            _query_count.reset(token)
+        return self.check_budget(request, response, count[0])
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        # the list is shared with the threads the async ORM runs the queries in
+        count = [0]
+        token = _query_count.set(count)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _query_count.reset(token)
+        return self.check_budget(request, response, count[0])
+
+    def check_budget(
+        self, request: HttpRequest, response: HttpResponse, count: int
+    ) -> HttpResponse:
+        response["X-Query-Count"] = str(count)
+        view_name = getattr(request.resolver_match, "view_name", None)
+        budget = ENDPOINT_BUDGETS.get((view_name, request.method))
+        budget = budget.queries if budget else self.settings["DEFAULT"]
+        if count <= budget:
+            return response
+        message = "%s %s ran %d queries, over the budget of %d" % (
+            request.method,
+            view_name or request.path,
+            count,
+            budget,
+        )
+        if self.settings["RAISE"]:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+        return response
@@ -0,0 +1,29 @@
+from django.db import migrations
+
+from wakka.hashers import ServerApiKeyHasher
+
+
+def rehash_server_api_keys(apps, schema_editor):
+    """Rehash the server api keys which are not nullified yet.
+    The remaining legacy hashes are upgraded on their first successful use."""
+    Application = apps.get_model("wakka", "Application")
+    db_alias = schema_editor.connection.alias
+    applications = Application.objects.using(db_alias).filter(
+        server_api_key__isnull=False
+    )
+    for app in applications:
+        app.server_api_key_hash = ServerApiKeyHasher.make(app.server_api_key)
+    Application.objects.using(db_alias).bulk_update(
+        applications, ["server_api_key_hash"]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wakka', '0009_rename_onetimetoken_onetimetokenrecords'),
+    ]
+
+    operations = [
+        migrations.RunPython(rehash_server_api_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.3 on 2026-10-18 07:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("wakka", "0010_rehash_server_api_keys"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                fields=["app", "email", "deleted_at"], name="user_app_email_deleted_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", True)),
+                fields=["app", "email"],
+                name="user_app_email_active_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.0.3 on 2026-10-18 07:54
+
+from django.db import migrations, models
+
+
+def remove_soft_deleted_duplicates(apps, schema_editor):
+    """Hard delete the soft deleted users which share the email and app of
+    another user, they would be replaced on the next sign up anyway. Active
+    users sharing an email abort the migration, they must be merged first."""
+    User = apps.get_model("wakka", "User")
+    users = User.objects.using(schema_editor.connection.alias)
+    active_duplicates = list(
+        users.filter(deleted_at__isnull=True)
+        .values("app", "email")
+        .annotate(count=models.Count("id"))
+        .filter(count__gt=1)
+        .order_by("app", "email")
+    )
+    if active_duplicates:
+        raise RuntimeError(
+            "Active users share an email within an app, merge or delete them "
+            "before adding the unique (app, email) constraint:\n"
+            + "\n".join(
+                f"  app {duplicate['app']}: {duplicate['email']} "
+                f"({duplicate['count']} users)"
+                for duplicate in active_duplicates
+            )
+        )
+    duplicates = (
+        users.values("app", "email")
+        .annotate(count=models.Count("id"))
+        .filter(count__gt=1)
+    )
+    for duplicate in duplicates:
+        same_email = users.filter(app=duplicate["app"], email=duplicate["email"])
+        keep = same_email.order_by(
+            models.F("deleted_at").desc(nulls_first=True), "-date_joined"
+        ).first()
+        same_email.exclude(pk=keep.pk).filter(deleted_at__isnull=False).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("wakka", "0011_user_app_email_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_soft_deleted_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="user",
+            constraint=models.UniqueConstraint(
+                fields=("app", "email"), name="user_app_email_uniq"
+            ),
+        ),
+        # both lookups are served by the unique index now
+        migrations.RemoveIndex(
+            model_name="user",
+            name="user_app_email_deleted_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="user",
+            name="user_app_email_active_idx",
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.0.3 on 2026-10-18 13:40
+
+from django.db import migrations, models
+from django.utils import timezone
+
+import wakka.fields
+
+
+def convert_jti_to_binary(apps, schema_editor):
+    """Store the hex `jti` of the live records as bytes, expired records
+    and any `jti` which is not a uuid are deleted."""
+    OnetimeTokenRecords = apps.get_model("wakka", "OnetimeTokenRecords")
+    db_alias = schema_editor.connection.alias
+    records = OnetimeTokenRecords.objects.using(db_alias)
+    records.filter(expires_at__lt=timezone.now()).delete()
+    for record in records.iterator():
+        try:
+            record.jti_bytes = bytes.fromhex(record.jti)
+        except ValueError:
+            record.delete(using=db_alias)
+            continue
+        if len(record.jti_bytes) != 16:
+            record.delete(using=db_alias)
+            continue
+        record.save(using=db_alias, update_fields=["jti_bytes"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("wakka", "0012_user_app_email_unique"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="onetimetokenrecords",
+            name="jti_bytes",
+            field=wakka.fields.JTIField(null=True),
+        ),
+        migrations.RunPython(convert_jti_to_binary, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name="onetimetokenrecords",
+            name="jti",
+        ),
+        migrations.RenameField(
+            model_name="onetimetokenrecords",
+            old_name="jti_bytes",
+            new_name="jti",
+        ),
+        migrations.AlterField(
+            model_name="onetimetokenrecords",
+            name="jti",
+            field=wakka.fields.JTIField(unique=True),
+        ),
+        migrations.AddIndex(
+            model_name="onetimetokenrecords",
+            index=models.Index(fields=["expires_at"], name="onetime_token_expires_idx"),
+        ),
+    ]
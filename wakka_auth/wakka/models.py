@@ -1,13 +1,15 @@
 import re
 from uuid import uuid4
 
-from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 from django.core.exceptions import ValidationError
 from django.core.management.utils import get_random_secret_key
 from django.db import models
 from django.utils import timezone
 
+from .constants import APP_NAME_MAX_LENGTH, APP_NAME_REGEX
+from .fields import JTIField
+from .hashers import ServerApiKeyHasher
 from .manager import AppManager, UserManager
 
 
@@ -16,7 +18,7 @@ class Application(models.Model):
     title = models.CharField(max_length=40)
     deleted_at = models.DateTimeField(null=True, blank=True)
     app_name = models.CharField(
-        max_length=40,
+        max_length=APP_NAME_MAX_LENGTH,
         unique=True,
         help_text="Unique name for the application. Contains lowercase letters, numbers, and underscores. No spaces allowed.",
     )  # app name should always contain lowercase letters, numbers, and underscores
@@ -31,10 +33,20 @@ class Application(models.Model):
 
     def generate_server_api_key(self, save=True):
         self.server_api_key = get_random_secret_key()
-        self.server_api_key_hash = make_password(self.server_api_key)
+        self.server_api_key_hash = ServerApiKeyHasher.make(self.server_api_key)
         if save:
             self.save()
 
+    def check_server_api_key(self, server_api_key: str) -> bool:
+        def setter(raw_server_api_key):
+            # upgrade the legacy hash to the current scheme
+            self.server_api_key_hash = ServerApiKeyHasher.make(raw_server_api_key)
+            self.save(update_fields=["server_api_key_hash"])
+
+        return ServerApiKeyHasher.verify(
+            server_api_key, self.server_api_key_hash, setter
+        )
+
     def nullify_server_api_key(self):
         self.server_api_key = None
         self.save()
@@ -42,7 +54,7 @@ class Application(models.Model):
     def clean(self):
         if not self.app_name.islower():
             raise ValidationError("App name must be in lowercase")
-        if not re.match("^[a-z0-9_]*$", self.app_name):
+        if not re.match(APP_NAME_REGEX, self.app_name):
             raise ValidationError(
                 "App name must contain only lowercase letters, numbers, and underscores"
             )
@@ -85,6 +97,15 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     objects = UserManager()
 
+    class Meta:
+        constraints = [
+            # at most one row per email within an app, including the soft
+            # deleted users, whose row is reclaimed by `AuthService.create_user`
+            models.UniqueConstraint(
+                fields=["app", "email"], name="user_app_email_uniq"
+            ),
+        ]
+
     def __str__(self):
         return f"<{self.name}: {self.email}>"
 
@@ -114,5 +135,46 @@ class User(AbstractBaseUser, PermissionsMixin):
 
 class OnetimeTokenRecords(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
-    jti = models.CharField(max_length=255, unique=True)
+    jti = JTIField(unique=True)
     expires_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            # expired records are deleted in batches by `OneTimeTokenSweeper`
+            models.Index(fields=["expires_at"], name="onetime_token_expires_idx"),
+        ]
+
+
+class OutboxEmail(models.Model):
+    """An email waiting for, or done with, delivery by the outbox worker"""
+
+    class Status(models.TextChoices):
+        PENDING = "PENDING"
+        SENT = "SENT"
+        FAILED = "FAILED"
+
+    id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
+    to = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    content_subtype = models.CharField(max_length=20, default="html")
+    status = models.CharField(
+        max_length=10, choices=Status.choices, default=Status.PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # due time of a pending email, also the lease of a claimed one
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # the claim query of the worker, and the purge of sent emails
+            models.Index(
+                fields=["status", "next_attempt_at"], name="outbox_status_due_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"<{self.status}: {self.subject} to {self.to}>"
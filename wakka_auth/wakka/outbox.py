@@ -0,0 +1,146 @@
+import datetime
+import logging
+import random
+
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.db import transaction
+from django.utils import timezone
+
+from .mail import EmailConnection
+from .models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+
+class EmailOutbox:
+    """Emails are written to the `OutboxEmail` table by the request and
+    delivered by the `send_outbox_emails` worker, so a request does not wait
+    for the SMTP server.
+
+    Workers claim due emails in batches with `SELECT ... FOR UPDATE SKIP
+    LOCKED`, so several workers never claim the same email, and lease them
+    for `CLAIM_TIMEOUT` by moving their due time, so the emails of a worker
+    which died are retried once the lease ends. Failed deliveries are
+    retried with exponential backoff up to `MAX_ATTEMPTS` times, then kept
+    as `FAILED` with the last error.
+    """
+
+    _settings = settings.EMAIL_OUTBOX_SETTINGS
+
+    @classmethod
+    def enqueue(
+        cls, to: str, subject: str, body: str, content_subtype: str = "html"
+    ) -> OutboxEmail:
+        return OutboxEmail.objects.create(
+            to=to, subject=subject, body=body, content_subtype=content_subtype
+        )
+
+    @classmethod
+    def claim(cls, batch_size: int = None) -> list[OutboxEmail]:
+        """Claim the due pending emails, oldest first"""
+        batch_size = batch_size or cls._settings["BATCH_SIZE"]
+        now = timezone.now()
+        with transaction.atomic():
+            emails = list(
+                OutboxEmail.objects.select_for_update(skip_locked=True)
+                .filter(status=OutboxEmail.Status.PENDING, next_attempt_at__lte=now)
+                .order_by("next_attempt_at")[:batch_size]
+            )
+            claimed, abandoned = [], []
+            for email in emails:
+                if email.attempts >= cls._settings["MAX_ATTEMPTS"]:
+                    # the lease of the last attempt ended, its worker died
+                    email.status = OutboxEmail.Status.FAILED
+                    email.last_error = email.last_error or "Delivery not confirmed"
+                    abandoned.append(email)
+                    continue
+                email.attempts += 1
+                email.next_attempt_at = now + cls._settings["CLAIM_TIMEOUT"]
+                claimed.append(email)
+            OutboxEmail.objects.bulk_update(
+                emails, ["status", "attempts", "next_attempt_at", "last_error"]
+            )
+        for email in abandoned:
+            logger.error(
+                "Giving up on email %s after %d attempts: %s",
+                email.pk,
+                email.attempts,
+                email.last_error,
+            )
+        return claimed
+
+    @classmethod
+    def deliver(cls, batch_size: int = None) -> tuple[int, int]:
+        """Claim and send a batch of emails over the connection of the worker,
+        returns the sent and failed deliveries. Nothing is locked while
+        sending."""
+        emails = cls.claim(batch_size)
+        if not emails:
+            return 0, 0
+        errors = EmailConnection.send_messages([cls.message(e) for e in emails])
+        sent, failed = [], []
+        now = timezone.now()
+        for email, error in zip(emails, errors):
+            if error is not None:
+                cls.record_failure(email, error)
+                failed.append(email)
+            else:
+                email.status = OutboxEmail.Status.SENT
+                email.sent_at = now
+                sent.append(email)
+        OutboxEmail.objects.bulk_update(sent, ["status", "sent_at"])
+        OutboxEmail.objects.bulk_update(
+            failed, ["status", "next_attempt_at", "last_error"]
+        )
+        return len(sent), len(failed)
+
+    @classmethod
+    def message(cls, email: OutboxEmail) -> EmailMessage:
+        message = EmailMessage(subject=email.subject, body=email.body, to=[email.to])
+        message.content_subtype = email.content_subtype
+        return message
+
+    @classmethod
+    def record_failure(cls, email: OutboxEmail, error: Exception) -> None:
+        email.last_error = f"{type(error).__name__}: {error}"
+        if email.attempts >= cls._settings["MAX_ATTEMPTS"]:
+            email.status = OutboxEmail.Status.FAILED
+            logger.error(
+                "Giving up on email %s after %d attempts: %s",
+                email.pk,
+                email.attempts,
+                email.last_error,
+            )
+            return
+        email.next_attempt_at = timezone.now() + cls.backoff(email.attempts)
+        logger.warning(
+            "Email %s failed, attempt %d: %s",
+            email.pk,
+            email.attempts,
+            email.last_error,
+        )
+
+    @classmethod
+    def backoff(cls, attempts: int) -> datetime.timedelta:
+        """Exponential backoff with full jitter"""
+        delay = min(
+            cls._settings["RETRY_BACKOFF"] * 2 ** (attempts - 1),
+            cls._settings["RETRY_BACKOFF_MAX"],
+        )
+        return delay * random.random()
+
+    @classmethod
+    def purge_sent(cls, batch_size: int = None) -> int:
+        """Delete a batch of the emails sent before `SENT_RETENTION`"""
+        batch_size = batch_size or cls._settings["BATCH_SIZE"]
+        before = timezone.now() - cls._settings["SENT_RETENTION"]
+        # the lease of a sent email ends shortly after it was sent, and the
+        # (status, next_attempt_at) index serves the lookup
+        ids = list(
+            OutboxEmail.objects.filter(
+                status=OutboxEmail.Status.SENT, next_attempt_at__lt=before
+            ).values_list("id", flat=True)[:batch_size]
+        )
+        deleted, _ = OutboxEmail.objects.filter(id__in=ids).delete()
+        return deleted
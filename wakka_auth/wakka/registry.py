@@ -0,0 +1,100 @@
+import re
+
+from asgiref.sync import sync_to_async
+from config.env import ENV
+from django.conf import settings
+
+from .cache import LRUCache
+from .constants import APP_NAME_MAX_LENGTH, APP_NAME_REGEX, DEFAULT_APP_NAME
+from .models import Application
+from .routers import APPLICATIONS_KEY, ReplicaReads
+
+_APP_NAME_PATTERN = re.compile(APP_NAME_REGEX)
+
+
+class ApplicationRegistry:
+    """Process local registry of `Application` rows keyed by `app_name`.
+
+    Saves the database lookup done by the authentication classes on each request.
+    Entries expire after `TTL` seconds, so changes made by other processes are
+    picked up eventually, and the whole registry is invalidated in-process
+    whenever an application is saved or deleted (see `signals.py`).
+
+    App names which can never be valid are rejected without any query, and
+    recently rejected app names are remembered for `NEGATIVE_TTL` seconds so
+    junk headers do not reach the database either. The invalidation only
+    reaches the process which saved the application, so an application
+    created in another process stays missing here for up to `NEGATIVE_TTL`.
+
+    In `SINGLE_APP` mode the default application is resolved on first use and
+    expires after `TTL` seconds like the other entries.
+    """
+
+    _settings = settings.APP_REGISTRY_SETTINGS
+    _apps = LRUCache(
+        max_entries=_settings["MAX_ENTRIES"],
+        ttl=_settings["TTL"].total_seconds(),
+    )
+    # default application of the `SINGLE_APP` mode
+    _default_app = LRUCache(max_entries=1, ttl=_settings["TTL"].total_seconds())
+    _rejected = LRUCache(
+        max_entries=_settings["NEGATIVE_MAX_ENTRIES"],
+        ttl=_settings["NEGATIVE_TTL"].total_seconds(),
+    )
+
+    @classmethod
+    def is_valid_app_name(cls, app_name: str) -> bool:
+        """Cheap check mirroring `Application.clean`"""
+        return bool(
+            app_name
+            and len(app_name) <= APP_NAME_MAX_LENGTH
+            and _APP_NAME_PATTERN.match(app_name)
+        )
+
+    @classmethod
+    def get_by_app_name(cls, app_name: str) -> Application | None:
+        """Get the application by app name. Returns None if it does not exist."""
+        if not cls.is_valid_app_name(app_name) or cls._rejected.get(app_name):
+            return None
+        app = cls._apps.get_or_load(app_name, lambda: cls._load(app_name))
+        if app is None:
+            cls._rejected.set(app_name, True)
+        return app
+
+    @classmethod
+    def _load(cls, app_name: str) -> Application | None:
+        with ReplicaReads.using(APPLICATIONS_KEY):
+            return Application.objects.filter(app_name=app_name).first()
+
+    @classmethod
+    async def aget_by_app_name(cls, app_name: str) -> Application | None:
+        """Async variant of `get_by_app_name`, only a miss leaves the event loop."""
+        if not cls.is_valid_app_name(app_name) or cls._rejected.get(app_name):
+            return None
+        app = cls._apps.get(app_name)
+        if app is None:
+            app = await sync_to_async(cls.get_by_app_name)(app_name)
+        return app
+
+    @classmethod
+    def get_default(cls) -> Application:
+        """Get or create the default application used in `SINGLE_APP` mode."""
+        return cls._default_app.get_or_load(
+            DEFAULT_APP_NAME,
+            lambda: Application.objects.get_or_create(
+                defaults={"title": ENV.APP_NAME}, app_name=DEFAULT_APP_NAME
+            )[0],
+        )
+
+    @classmethod
+    async def aget_default(cls) -> Application:
+        app = cls._default_app.get(DEFAULT_APP_NAME)
+        if app is None:
+            app = await sync_to_async(cls.get_default)()
+        return app
+
+    @classmethod
+    def invalidate(cls) -> None:
+        cls._apps.clear()
+        cls._default_app.clear()
+        cls._rejected.clear()
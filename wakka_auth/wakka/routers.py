@@ -0,0 +1,126 @@
+import random
+import unicodedata
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .cache import is_shared_cache
+
+APPLICATIONS_KEY = "applications"
+
+# sticky keys of the current read-only service call, `False` inside `primary()`
+_replica_reads: ContextVar[tuple[str, ...] | bool | None] = ContextVar(
+    "wakka_replica_reads", default=None
+)
+
+
+def user_key(user_id) -> str:
+    return f"user:{user_id}"
+
+
+def email_key(app_id, email: str) -> str:
+    """Folded like the lookup on MySQL, whose collation ignores case, so a
+    request email differing from the stored one still hits the sticky key"""
+    email = unicodedata.normalize("NFKC", (email or "").strip()).casefold()
+    return f"email:{app_id}:{email}"
+
+
+class ReplicaReads:
+    """Read-only service calls opt in to the read replicas with `using`,
+    everything else, and any read inside a transaction, stays on the primary.
+
+    Writes mark keys as sticky for `STICKY_WINDOW` seconds, the replication
+    lag budget. Reads of a sticky key go to the primary, so a client reads
+    its own writes, e.g. logging in right after verifying the email. Sticky
+    keys are kept in the `STICKY_CACHE` Django cache, which must be shared by
+    the workers, e.g. memcached, to hold across processes.
+    """
+
+    @classmethod
+    def replicas(cls) -> list[str]:
+        return settings.DATABASE_REPLICA_SETTINGS["REPLICAS"]
+
+    @classmethod
+    def check_cache(cls) -> None:
+        """Refuses replicas with a process local sticky cache, a worker would
+        not see the writes of the others"""
+        alias = settings.DATABASE_REPLICA_SETTINGS["STICKY_CACHE"]
+        if cls.replicas() and not is_shared_cache(alias):
+            raise ImproperlyConfigured(
+                f"Read replicas need a shared `{alias}` cache for the sticky "
+                "keys, set WAKKA_CACHE_LOCATION"
+            )
+
+    @classmethod
+    @contextmanager
+    def using(cls, *sticky_keys: str) -> Iterator[None]:
+        """Reads in the block may go to a replica unless a key is sticky"""
+        if _replica_reads.get() is False or not cls.replicas():
+            yield
+            return
+        token = _replica_reads.set(sticky_keys)
+        try:
+            yield
+        finally:
+            _replica_reads.reset(token)
+
+    @classmethod
+    @contextmanager
+    def primary(cls) -> Iterator[None]:
+        """Reads in the block go to the primary, for reads followed by a write"""
+        token = _replica_reads.set(False)
+        try:
+            yield
+        finally:
+            _replica_reads.reset(token)
+
+    @classmethod
+    def stick(cls, *keys: str) -> None:
+        if not cls.replicas():
+            return
+        window = settings.DATABASE_REPLICA_SETTINGS["STICKY_WINDOW"].total_seconds()
+        cls._cache().set_many({f"wakka:sticky:{key}": True for key in keys}, window)
+
+    @classmethod
+    def is_sticky(cls, keys: tuple[str, ...]) -> bool:
+        if not keys:
+            return False
+        return bool(cls._cache().get_many([f"wakka:sticky:{key}" for key in keys]))
+
+    @classmethod
+    def choose_replica(cls) -> str | None:
+        sticky_keys = _replica_reads.get()
+        if sticky_keys is None or sticky_keys is False:
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        if cls.is_sticky(sticky_keys):
+            return None
+        return random.choice(cls.replicas())
+
+    @classmethod
+    def _cache(cls):
+        return caches[settings.DATABASE_REPLICA_SETTINGS["STICKY_CACHE"]]
+
+
+class ReplicaRouter:
+    """Routes the reads of `ReplicaReads.using` blocks to a random replica
+    and every write to the primary."""
+
+    def db_for_read(self, model, **hints):
+        return ReplicaReads.choose_replica()
+
+    def db_for_write(self, model, **hints):
+        # explicit, rows read from a replica must still be saved to the primary
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *ReplicaReads.replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
@@ -9,6 +9,11 @@ from .models import User
 class HealthCheckResponseSerializer(serializers.Serializer):
     database = serializers.BooleanField()
     server = serializers.BooleanField()
+    database_latency_ms = serializers.FloatField(allow_null=True)
+
+
+class LivenessCheckResponseSerializer(serializers.Serializer):
+    server = serializers.BooleanField()
 
 
 class TokenPairRequestSeralizer(serializers.Serializer):
@@ -1,9 +1,19 @@
+import asyncio
+import contextvars
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Mapping
 
-from django.contrib.auth.models import update_last_login
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.core.mail import EmailMessage
+from django.db import IntegrityError, connection, transaction
+from django.db.models import QuerySet
 from django.template.loader import render_to_string
 
+from .buffers import LastLoginBuffer
+from .cache import LRUCache
 from .constants import AuthTokenType, OneTimeTokenType
 from .exceptions import (
     EmailAlreadyVerifiedException,
@@ -17,28 +27,81 @@ from .exceptions import (
     UserNotVerifiedException,
     VerificationEmailSendingFailedException,
 )
+from .hashers import PasswordHashingExecutor
 from .models import Application, User
+from .outbox import EmailOutbox
+from .routers import ReplicaReads, email_key, user_key
 from .tokens import JWTToken, OneTimeJWTToken
 
+logger = logging.getLogger(__name__)
+
+
+def ping_database() -> float:
+    """Run `SELECT 1` on the database, returns the round trip in milliseconds"""
+    connection.close_if_unusable_or_obsolete()
+    start = time.perf_counter()
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+    return (time.perf_counter() - start) * 1000
+
 
 class AuthService:
+    # the readiness result is shared by the probes within the cache window
+    _health_check_cache = LRUCache(
+        max_entries=1,
+        ttl=settings.HEALTH_CHECK_SETTINGS["CACHE_WINDOW"].total_seconds(),
+    )
+    # dedicated thread so a hanging database cannot block the probe
+    _health_check_executor = ThreadPoolExecutor(
+        max_workers=1, thread_name_prefix="wakka-health-check"
+    )
+
+    @classmethod
+    def liveness_check(cls) -> Mapping[str, bool]:
+        """The process is able to serve requests, no I/O is done."""
+        return {"server": True}
+
     @classmethod
-    def health_check(cls) -> Mapping[str, bool]:
+    def health_check(cls) -> Mapping[str, Any]:
+        """Readiness of the service, checks the database with `SELECT 1`."""
+        return cls._health_check_cache.get_or_load("status", cls._check_database)
+
+    @classmethod
+    def _check_database(cls) -> Mapping[str, Any]:
         conn = False
+        latency = None
+        timeout = settings.HEALTH_CHECK_SETTINGS["DATABASE_TIMEOUT"].total_seconds()
         try:
-            User.objects.count()
+            # in the context of the request, its query is counted
+            future = cls._health_check_executor.submit(
+                contextvars.copy_context().run, ping_database
+            )
+            latency = future.result(timeout=timeout)
             conn = True
         except Exception as e:
             pass
         status = {
             "database": conn,
             "server": True,
+            "database_latency_ms": latency,
         }
         return status
 
     @classmethod
     def get_user_by_id(cls, user_id: str) -> User:
-        user = User.objects.filter(id=user_id).first()
+        # the app is joined, the serializers and tokens read `user.app`
+        with ReplicaReads.using(user_key(user_id)):
+            user = User.objects.select_related("app").filter(id=user_id).first()
+        if user:
+            return user
+        raise UserDoesNotExistException
+
+    @classmethod
+    async def aget_user_by_id(cls, user_id: str) -> User:
+        # the app is joined, serializing the user must not query in async context
+        with ReplicaReads.using(user_key(user_id)):
+            user = await User.objects.select_related("app").filter(id=user_id).afirst()
         if user:
             return user
         raise UserDoesNotExistException
@@ -48,13 +111,26 @@ class AuthService:
         cls, email: str = None, app: Application = None, raise_exception: bool = False
     ) -> User:
         """Get user by email and app. If user does not exist, return None."""
-        user = User.objects.filter(email=email, app=app).first()
+        with ReplicaReads.using(email_key(getattr(app, "pk", None), email)):
+            user = User.objects.filter(email=email, app=app).first()
+        if user:
+            # the app is known, `user.app` must not query it again
+            user.app = app
         # The exception is not raised by default, because in such cases,
         # the client does not need to know if the user exists or not.
         if raise_exception and not user:
             raise UserDoesNotExistException
         return user
 
+    @classmethod
+    async def aget_user_by_email(
+        cls, email: str = None, app: Application = None, raise_exception: bool = False
+    ) -> User:
+        """Async variant of `get_user_by_email`"""
+        return await sync_to_async(cls.get_user_by_email)(
+            email=email, app=app, raise_exception=raise_exception
+        )
+
     @classmethod
     def get_user_by_email_password(
         cls,
@@ -64,7 +140,7 @@ class AuthService:
     ) -> User:
         """Get user by email and password. If user does not exist, raise InvalidCredentialsException."""
         user = cls.get_user_by_email(email=email, app=app)
-        if user and user.check_password(password):
+        if user and PasswordHashingExecutor.check_password(user, password):
             return user
         raise InvalidCredentialsException
 
@@ -104,8 +180,8 @@ class AuthService:
         cls.check_user_active_status(user=user, raise_exception=True)
 
         refresh_token = JWTToken.obtain_refresh_token_for_user(user=user)
-        access_token = JWTToken.obtain_access_token_by_refresh_token(refresh_token)
-        update_last_login(None, user)
+        access_token = JWTToken.obtain_access_token_for_user(user=user)
+        LastLoginBuffer.touch(user)
 
         return {
             "refresh_token": refresh_token,
@@ -114,23 +190,88 @@ class AuthService:
 
     @classmethod
     def get_access_token(cls, refresh_token: str = None) -> dict:
-        if refresh_token:
-            try:
-                access_token = JWTToken.obtain_access_token_by_refresh_token(
-                    refresh_token
-                )
-            except Exception as e:
-                raise InvalidRefreshTokenException
-            decoded_token = JWTToken.verify_token(
+        if not refresh_token:
+            raise InvalidRefreshTokenException
+        # The refresh token is verified only once, the access token is minted
+        # from its payload after the user is checked.
+        try:
+            payload = JWTToken.verify_token(
                 token=refresh_token, type=AuthTokenType.REFRESH_TOKEN
             )
-            user = User.objects.get(id=decoded_token.get("user_id"))
-            cls.check_user_verification_status(user=user, raise_exception=True)
-            cls.check_user_active_status(user=user, raise_exception=True)
-            # Updating the last login time
-            update_last_login(None, user=user)
-            return {"access_token": access_token}
-        raise InvalidRefreshTokenException
+        except Exception as e:
+            raise InvalidRefreshTokenException
+        with ReplicaReads.using(user_key(payload.get("user_id"))):
+            user = cls._get_refresh_user_queryset(payload).first()
+        if not user:
+            raise InvalidRefreshTokenException
+        cls.check_user_verification_status(user=user, raise_exception=True)
+        cls.check_user_active_status(user=user, raise_exception=True)
+        # Updating the last login time
+        LastLoginBuffer.touch(user)
+        access_token = JWTToken.obtain_access_token_by_refresh_payload(
+            refresh_payload=payload
+        )
+        return {"access_token": access_token}
+
+    @classmethod
+    def _get_refresh_user_queryset(cls, payload: Mapping[str, Any]) -> QuerySet:
+        # Only the fields needed for the checks and the last login update
+        return User.objects.only(
+            "id", "username", "is_active", "verified", "last_login"
+        ).filter(id=payload.get("user_id"))
+
+    @classmethod
+    async def aget_token_pair(
+        cls,
+        email: str = None,
+        password: str = None,
+        app: Application = None,
+    ) -> dict:
+        """Async variant of `get_token_pair`, hashing and signing run off the
+        event loop."""
+        user = await cls.aget_user_by_email(email=email, app=app)
+        if not user or not await PasswordHashingExecutor.acheck_password(
+            user, password
+        ):
+            raise InvalidCredentialsException
+        cls.check_user_verification_status(user=user, raise_exception=True)
+        cls.check_user_active_status(user=user, raise_exception=True)
+
+        refresh_token, access_token = await asyncio.gather(
+            asyncio.to_thread(JWTToken.obtain_refresh_token_for_user, user=user),
+            asyncio.to_thread(JWTToken.obtain_access_token_for_user, user=user),
+        )
+        await sync_to_async(LastLoginBuffer.touch)(user)
+
+        return {
+            "refresh_token": refresh_token,
+            "access_token": access_token,
+        }
+
+    @classmethod
+    async def aget_access_token(cls, refresh_token: str = None) -> dict:
+        """Async variant of `get_access_token`"""
+        if not refresh_token:
+            raise InvalidRefreshTokenException
+        try:
+            payload = await asyncio.to_thread(
+                JWTToken.verify_token,
+                token=refresh_token,
+                type=AuthTokenType.REFRESH_TOKEN,
+            )
+        except Exception as e:
+            raise InvalidRefreshTokenException
+        with ReplicaReads.using(user_key(payload.get("user_id"))):
+            user = await cls._get_refresh_user_queryset(payload).afirst()
+        if not user:
+            raise InvalidRefreshTokenException
+        cls.check_user_verification_status(user=user, raise_exception=True)
+        cls.check_user_active_status(user=user, raise_exception=True)
+        await sync_to_async(LastLoginBuffer.touch)(user)
+        access_token = await asyncio.to_thread(
+            JWTToken.obtain_access_token_by_refresh_payload, refresh_payload=payload
+        )
+        return {"access_token": access_token}
 
     @classmethod
     def create_user(
@@ -141,42 +282,77 @@ class AuthService:
         app: Application = None,
         **extra_fields,
     ) -> User:
-        user = User.objects.include_deleted().filter(email=email, app=app)
         """
-        Checks if user already exists.
+        Inserts the user directly, the unique (app, email) constraint detects
+        an existing user.
         Case 1: User exists but soft deleted -> Hard delete the user and create a new user
         Case 2: User exists but not soft deleted -> Raise UserAlreadyExistsException
         """
-        if user.exists():
-            user = user.first()
-            if user.deleted_at:  # Case 1
-                user.hard_delete()
-            else:
-                raise UserAlreadyExistsException
-
-        user = User.objects.create_user(
+        user = User.objects.build_user(
             email=email,
             password=password,
             app=app,
             name=name,
             **extra_fields,
         )
+        try:
+            cls._insert_user(user)
+        except IntegrityError:
+            cls._reclaim_and_insert_user(user)
+        cls.stick_user(user)
         return user
 
+    @classmethod
+    def _insert_user(cls, user: User) -> None:
+        """A single INSERT. Inside a transaction it runs in a savepoint, so a
+        conflict does not break the transaction."""
+        if connection.in_atomic_block:
+            with transaction.atomic():
+                user.save(force_insert=True)
+        else:
+            user.save(force_insert=True)
+
+    @classmethod
+    def _reclaim_and_insert_user(cls, user: User) -> None:
+        try:
+            with transaction.atomic():
+                existing = (
+                    User.objects.include_deleted()
+                    .select_for_update()
+                    .filter(email=user.email, app=user.app)
+                    .first()
+                )
+                if existing and not existing.deleted_at:  # Case 2
+                    raise UserAlreadyExistsException
+                if existing:  # Case 1
+                    existing.hard_delete()
+                user.save(force_insert=True)
+        except IntegrityError:
+            # a concurrent sign up won, or the username is taken
+            raise UserAlreadyExistsException
+
     @classmethod
     def update_user(cls, user_id: str, **validated_data) -> User:
-        user = cls.get_user_by_id(user_id)
+        with ReplicaReads.primary():
+            user = cls.get_user_by_id(user_id)
         cls.check_user_verification_status(user=user, raise_exception=True)
         for key, value in validated_data.items():
             setattr(user, key, value)
         user.save()
+        cls.stick_user(user)
         return user
 
+    @classmethod
+    def stick_user(cls, user: User) -> None:
+        """Reads of the user go to the primary until the replicas catch up"""
+        ReplicaReads.stick(user_key(user.pk), email_key(user.app_id, user.email))
+
     @classmethod
     def delete_user(cls, user_id: str) -> None:
         user = User.objects.filter(id=user_id).first()
         if user:
             user.delete()
+            return
         raise UserDoesNotExistException
 
     @classmethod
@@ -201,27 +377,26 @@ class AuthService:
             {"user": user, "verify_url": verify_url, "app": app},
         )
 
-        email = EmailMessage(subject=mail_subject, body=message, to=[user.email])
-        email.content_subtype = "html"
-        try:
-            email.send()
-        except Exception as e:
-            print(e.__traceback__)
-            raise VerificationEmailSendingFailedException
+        cls.send_email(
+            to=user.email,
+            subject=mail_subject,
+            body=message,
+            failure=VerificationEmailSendingFailedException,
+        )
 
     @classmethod
     def validate_email_verification_token(cls, token: str) -> None:
         if not token:
             raise OneTimeTokenInvalidException
         try:
-            payload = OneTimeJWTToken.verify(token)
-            if payload["type"] != OneTimeTokenType.EMAIL_VERIFICATION.value:
-                raise OneTimeTokenInvalidException
-            user = cls.get_user_by_id(payload.get("user_id"))
+            _, user = cls.consume_one_time_token(
+                token, OneTimeTokenType.EMAIL_VERIFICATION
+            )
             # set user as verified and active once the email is verified
             user.is_active = True
             user.verified = True
             user.save()
+            cls.stick_user(user)
         except Exception as e:
             raise e
 
@@ -243,26 +418,56 @@ class AuthService:
             {"user": user, "reset_url": reset_url, "app": app},
         )
 
-        email = EmailMessage(subject=mail_subject, body=message, to=[user.email])
+        cls.send_email(
+            to=user.email,
+            subject=mail_subject,
+            body=message,
+            failure=ForgotPasswordEmailSendingFailedException,
+        )
+
+    @classmethod
+    def send_email(
+        cls, to: str, subject: str, body: str, failure: type[Exception]
+    ) -> None:
+        """Queue an html email in the outbox, or send it right away if the
+        outbox is disabled, raising `failure` if sending fails."""
+        if settings.EMAIL_OUTBOX_SETTINGS["ENABLED"]:
+            EmailOutbox.enqueue(to=to, subject=subject, body=body)
+            return
+        email = EmailMessage(subject=subject, body=body, to=[to])
         email.content_subtype = "html"
         try:
             email.send()
-        except Exception as e:
-            print(e.__traceback__)
-            raise ForgotPasswordEmailSendingFailedException
+        except Exception:
+            logger.exception("Sending the email %r to %s failed", subject, to)
+            raise failure
 
     @classmethod
-    def validate_forgot_password_token(cls, token: str) -> Mapping[str, Any]:
+    def validate_forgot_password_token(cls, token: str) -> User:
+        """Use up a forgot password token, returns its user"""
         if not token:
             raise OneTimeTokenInvalidException
         try:
-            payload = OneTimeJWTToken.verify(token)
-            if payload["type"] != OneTimeTokenType.FOROGT_PASSWORD.value:
-                raise OneTimeTokenInvalidException
-            return payload
+            _, user = cls.consume_one_time_token(
+                token, OneTimeTokenType.FOROGT_PASSWORD
+            )
+            return user
         except Exception as e:
             raise e
 
+    @classmethod
+    def consume_one_time_token(
+        cls, token: str, type: OneTimeTokenType
+    ) -> tuple[Mapping[str, Any], User]:
+        payload = OneTimeJWTToken.decode(token)
+        if payload.get("type") != type.value:
+            raise OneTimeTokenInvalidException
+        # stateless tokens are checked against the current state of the user
+        with ReplicaReads.primary():
+            user = cls.get_user_by_id(payload.get("user_id"))
+        OneTimeJWTToken.consume(payload, user)
+        return payload, user
+
     @classmethod
     def generate_one_time_verification_token(
         cls, user: User = None, type: str = None
@@ -270,13 +475,16 @@ class AuthService:
         token = OneTimeJWTToken.obtain(
             payload={
                 "user_id": str(user.pk),
-                "app_id": str(user.app.pk),
+                "app_id": str(user.app_id),
                 "type": type,
-            }
+            },
+            user=user,
         )
         return token
 
     @classmethod
     def change_password(cls, user: User = None, password: str = None) -> None:
-        user.set_password(password)
-        user.save()
+        PasswordHashingExecutor.set_password(user, password)
+        # only the password, the user may have been read from a replica
+        user.save(update_fields=["password"])
+        cls.stick_user(user)
@@ -0,0 +1,20 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Application
+from .registry import ApplicationRegistry
+from .routers import APPLICATIONS_KEY, ReplicaReads
+
+
+@receiver(post_save, sender=Application)
+@receiver(post_delete, sender=Application)
+def invalidate_application_registry(sender, **kwargs):
+    """Covers `Application.save`, the soft `Application.delete`,
+    `nullify_server_api_key` and hard deletes from the admin."""
+    ApplicationRegistry.invalidate()
+    # reload the applications from the primary until the replicas catch up
+    ReplicaReads.stick(APPLICATIONS_KEY)
+    # invalidate again once committed, in case a concurrent request cached
+    # the old row before the transaction was committed
+    transaction.on_commit(ApplicationRegistry.invalidate)
@@ -0,0 +1,104 @@
+import abc
+import datetime
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+
+from .cache import LRUCache, is_shared_cache
+from .models import OnetimeTokenRecords
+from .sweepers import OneTimeTokenSweeper
+
+
+class OneTimeTokenStore(abc.ABC):
+    """Records of the issued one time tokens which were not used yet.
+
+    `consume` removes the record and reports whether it was there and not
+    expired in a single atomic step, so of concurrent uses of a token only
+    one succeeds.
+    """
+
+    @classmethod
+    @abc.abstractmethod
+    def add(cls, jti: bytes, expires_at: datetime.datetime) -> None: ...
+
+    @classmethod
+    @abc.abstractmethod
+    def consume(cls, jti: bytes) -> bool: ...
+
+    @classmethod
+    def check(cls) -> None:
+        """Raises `ImproperlyConfigured` when the store cannot work as set up,
+        checked on startup"""
+
+
+class DatabaseTokenStore(OneTimeTokenStore):
+    """`OnetimeTokenRecords` rows, expired rows are deleted by
+    `OneTimeTokenSweeper`."""
+
+    @classmethod
+    def add(cls, jti: bytes, expires_at: datetime.datetime) -> None:
+        OnetimeTokenRecords.objects.create(jti=jti, expires_at=expires_at)
+        OneTimeTokenSweeper.maybe_sweep()
+
+    @classmethod
+    def consume(cls, jti: bytes) -> bool:
+        # a single DELETE ... WHERE, the model has no relations or signals
+        # to collect, the affected row count decides
+        deleted, _ = OnetimeTokenRecords.objects.filter(
+            jti=jti, expires_at__gt=timezone.now()
+        ).delete()
+        return deleted > 0
+
+
+class LocalTokenStore(OneTimeTokenStore):
+    """Records in the memory of the process, for a single worker only, e.g.
+    development. Tokens do not survive a restart."""
+
+    _records = LRUCache(
+        max_entries=settings.ONE_TIME_TOKEN_STORE_SETTINGS["LOCAL_MAX_ENTRIES"]
+    )
+
+    @classmethod
+    def add(cls, jti: bytes, expires_at: datetime.datetime) -> None:
+        ttl = (expires_at - timezone.now()).total_seconds()
+        cls._records.set(jti, True, ttl=ttl)
+
+    @classmethod
+    def consume(cls, jti: bytes) -> bool:
+        return cls._records.pop(jti, False)
+
+
+class CacheTokenStore(OneTimeTokenStore):
+    """Records in the `CACHE` Django cache, which expires them. Shared by
+    the workers with e.g. memcached or redis, whose delete is atomic."""
+
+    @classmethod
+    def _cache(cls):
+        return caches[settings.ONE_TIME_TOKEN_STORE_SETTINGS["CACHE"]]
+
+    @classmethod
+    def check(cls) -> None:
+        alias = settings.ONE_TIME_TOKEN_STORE_SETTINGS["CACHE"]
+        if not is_shared_cache(alias):
+            # each worker would only accept the tokens it issued itself
+            raise ImproperlyConfigured(
+                f"The cache one time token store needs a shared `{alias}` "
+                "cache, set WAKKA_CACHE_LOCATION"
+            )
+
+    @classmethod
+    def _key(cls, jti: bytes) -> str:
+        return f"wakka:onetime:{jti.hex()}"
+
+    @classmethod
+    def add(cls, jti: bytes, expires_at: datetime.datetime) -> None:
+        timeout = (expires_at - timezone.now()).total_seconds()
+        # some caches still delete a key which expired but was not evicted
+        if timeout > 0:
+            cls._cache().set(cls._key(jti), True, timeout)
+
+    @classmethod
+    def consume(cls, jti: bytes) -> bool:
+        return cls._cache().delete(cls._key(jti))
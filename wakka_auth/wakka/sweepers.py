@@ -0,0 +1,83 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from .models import OnetimeTokenRecords
+
+logger = logging.getLogger(__name__)
+
+
+class OneTimeTokenSweeper:
+    """Deletes expired `OnetimeTokenRecords`, whose links were never used.
+
+    Records are deleted oldest first in batches of `BATCH_SIZE` through the
+    `expires_at` index, pausing `BATCH_PAUSE` between batches so a large
+    backlog does not hold locks or flood the replicas. Run it with the
+    `sweep_one_time_tokens` command, or let each worker sweep up to
+    `MAX_BATCHES` batches in a background thread every `INTERVAL`, checked
+    when a one time token is issued.
+    """
+
+    _settings = settings.ONE_TIME_TOKEN_SWEEPER_SETTINGS
+    _lock = threading.Lock()
+    _last_sweep = time.monotonic()
+    _executor = ThreadPoolExecutor(
+        max_workers=1, thread_name_prefix="wakka-token-sweeper"
+    )
+
+    @classmethod
+    def sweep(
+        cls, batch_size: int = None, max_batches: int = None, pause: float = None
+    ) -> int:
+        """Delete expired records until none is left or `max_batches` batches
+        were deleted, returns the number of records deleted"""
+        batch_size = batch_size or cls._settings["BATCH_SIZE"]
+        if pause is None:
+            pause = cls._settings["BATCH_PAUSE"].total_seconds()
+        deleted = batches = 0
+        while max_batches is None or batches < max_batches:
+            now = timezone.now()
+            # MySQL does not support LIMIT in a DELETE subquery
+            ids = list(
+                OnetimeTokenRecords.objects.filter(expires_at__lt=now)
+                .order_by("expires_at")
+                .values_list("id", flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            count, _ = OnetimeTokenRecords.objects.filter(id__in=ids).delete()
+            deleted += count
+            batches += 1
+            if len(ids) < batch_size:
+                break
+            time.sleep(pause)
+        return deleted
+
+    @classmethod
+    def maybe_sweep(cls) -> None:
+        """Sweep in the background if `INTERVAL` passed since the last sweep"""
+        interval = cls._settings["INTERVAL"].total_seconds()
+        if not interval:
+            return
+        with cls._lock:
+            if time.monotonic() - cls._last_sweep < interval:
+                return
+            cls._last_sweep = time.monotonic()
+        cls._executor.submit(cls._periodic_sweep)
+
+    @classmethod
+    def _periodic_sweep(cls) -> None:
+        try:
+            deleted = cls.sweep(max_batches=cls._settings["MAX_BATCHES"])
+            if deleted:
+                logger.info("Deleted %d expired one time token records", deleted)
+        except Exception:
+            logger.exception("Failed to sweep expired one time token records")
+        finally:
+            # the connections of this thread are not closed by any request
+            connections.close_all()
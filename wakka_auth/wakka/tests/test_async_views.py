@@ -0,0 +1,134 @@
+import json
+
+from django.test import AsyncRequestFactory, TestCase
+
+from wakka import async_views
+from wakka.buffers import LastLoginBuffer
+from wakka.models import Application, User
+from wakka.registry import ApplicationRegistry
+from wakka.services import AuthService
+from wakka.tokens import JWTToken
+
+UNKNOWN_USER_ID = "00000000-0000-0000-0000-000000000000"
+
+
+class AsyncViewTests(TestCase):
+    """The async views served with `WAKKA_ASGI=true` answer like the DRF views"""
+
+    password = "S3cure!password"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.app = Application(app_name="async", title="Async")
+        cls.app.generate_server_api_key()
+        cls.user = AuthService.create_user(
+            email="jane@example.com",
+            password=cls.password,
+            name="Jane",
+            app=cls.app,
+        )
+        User.objects.filter(pk=cls.user.pk).update(verified=True, is_active=True)
+
+    def setUp(self):
+        ApplicationRegistry.invalidate()
+        LastLoginBuffer._pending.clear()
+
+    async def request(self, view, method="POST", data=None, headers=None, **kwargs):
+        request = AsyncRequestFactory().generic(
+            method,
+            "/",
+            json.dumps(data) if isinstance(data, dict) else data or "",
+            content_type="application/json",
+            headers={
+                "X-App-Name": self.app.app_name,
+                "X-Server-Api-Key": self.app.server_api_key,
+                **(headers or {}),
+            },
+        )
+        response = await view.as_view()(request, **kwargs)
+        return response, json.loads(response.content or b"{}")
+
+    async def test_obtain_token(self):
+        response, body = await self.request(
+            async_views.TokenObtainPairView,
+            data={"email": self.user.email, "password": self.password},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(body["data"]), {"access_token", "refresh_token"})
+        self.assertIn(self.user.pk, LastLoginBuffer._pending)
+
+    async def test_obtain_token_invalid_credentials(self):
+        response, body = await self.request(
+            async_views.TokenObtainPairView,
+            data={"email": self.user.email, "password": "wrong"},
+        )
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(body["code"], "INVALID_CREDENTIALS")
+
+    async def test_obtain_token_unknown_app(self):
+        response, body = await self.request(
+            async_views.TokenObtainPairView,
+            data={"email": self.user.email, "password": self.password},
+            headers={"X-App-Name": "unknown"},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(body["code"], "INVALID_APP_NAME")
+
+    async def test_obtain_token_malformed_body(self):
+        response, _ = await self.request(async_views.TokenObtainPairView, data="{")
+        self.assertEqual(response.status_code, 400)
+
+    async def test_refresh_token(self):
+        refresh_token = JWTToken.obtain_refresh_token_for_user(user=self.user)
+        response, body = await self.request(
+            async_views.TokenRefreshView, data={"refresh_token": refresh_token}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("access_token", body["data"])
+
+    async def test_refresh_token_invalid(self):
+        response, body = await self.request(
+            async_views.TokenRefreshView, data={"refresh_token": "not.a.token"}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(body["code"], "INVALID_REFRESH_TOKEN")
+
+    async def test_user_detail(self):
+        response, body = await self.request(
+            async_views.UserDetailView, "GET", user_id=str(self.user.pk)
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body["data"]["email"], self.user.email)
+
+    async def test_user_detail_unknown_user(self):
+        response, body = await self.request(
+            async_views.UserDetailView, "GET", user_id=UNKNOWN_USER_ID
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(body["code"], "USER_DOES_NOT_EXIST")
+
+    async def test_user_detail_invalid_server_api_key(self):
+        response, body = await self.request(
+            async_views.UserDetailView,
+            "GET",
+            headers={"X-Server-Api-Key": "wrong"},
+            user_id=str(self.user.pk),
+        )
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(body["code"], "INVALID_SERVER_API_KEY")
+
+    async def test_user_detail_update_and_delete(self):
+        response, body = await self.request(
+            async_views.UserDetailView,
+            "PUT",
+            data={"name": "Janet"},
+            user_id=str(self.user.pk),
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body["data"]["name"], "Janet")
+
+        response, _ = await self.request(
+            async_views.UserDetailView, "DELETE", user_id=str(self.user.pk)
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(await User.objects.filter(pk=self.user.pk).aexists())
@@ -0,0 +1,50 @@
+import datetime
+from unittest import mock
+
+from django.test import TransactionTestCase
+
+from wakka.buffers import LastLoginBuffer
+from wakka.models import Application, User
+
+
+class LastLoginBufferTests(TransactionTestCase):
+    """The timer flushes in its own thread, which only sees committed rows"""
+
+    def setUp(self):
+        LastLoginBuffer.flush()
+        app = Application(app_name="buffers", title="Buffers")
+        app.generate_server_api_key()
+        self.user = User.objects.create(
+            email="john@example.com",
+            username="buffers$$john@example.com",
+            name="John",
+            app=app,
+        )
+
+    def test_idle_worker_flushes_on_the_interval(self):
+        with mock.patch.dict(
+            LastLoginBuffer._settings,
+            {"FLUSH_INTERVAL": datetime.timedelta(milliseconds=200)},
+        ):
+            LastLoginBuffer.flush()
+            LastLoginBuffer.touch(self.user)
+            self.assertIsNone(User.objects.get(pk=self.user.pk).last_login)
+            # no further login, the timer writes it
+            timer = LastLoginBuffer._timer
+            timer.join(5)
+        self.assertFalse(timer.is_alive())
+        self.assertEqual(LastLoginBuffer._pending, {})
+        self.assertEqual(
+            User.objects.get(pk=self.user.pk).last_login, self.user.last_login
+        )
+
+    def test_flush_cancels_the_timer(self):
+        LastLoginBuffer.touch(self.user)
+        timer = LastLoginBuffer._timer
+        self.assertEqual(LastLoginBuffer.flush(), 1)
+        timer.join(5)
+        self.assertFalse(timer.is_alive())
+        self.assertIsNone(LastLoginBuffer._timer)
+        self.assertEqual(
+            User.objects.get(pk=self.user.pk).last_login, self.user.last_login
+        )
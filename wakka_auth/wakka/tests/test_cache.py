@@ -0,0 +1,106 @@
+import threading
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from wakka.cache import LRUCache
+
+
+class LRUCacheTests(SimpleTestCase):
+    def test_concurrent_misses_load_once(self):
+        cache = LRUCache()
+        loading = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def loader():
+            calls.append(threading.current_thread())
+            loading.set()
+            release.wait(5)
+            return "value"
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(cache.get_or_load("key", loader))
+            )
+            for _ in range(4)
+        ]
+        threads[0].start()
+        self.assertTrue(loading.wait(5))
+        for thread in threads[1:]:
+            thread.start()
+        # let the waiting threads block on the load
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ["value"] * 4)
+        self.assertEqual(cache.get("key"), "value")
+
+    def test_none_is_not_cached(self):
+        cache = LRUCache()
+        loader = mock.Mock(return_value=None)
+        self.assertIsNone(cache.get_or_load("key", loader))
+        self.assertIsNone(cache.get_or_load("key", loader))
+        self.assertEqual(loader.call_count, 2)
+
+    def test_clear_during_a_load_skips_storing(self):
+        cache = LRUCache()
+
+        def loader():
+            cache.clear()
+            return "stale"
+
+        self.assertEqual(cache.get_or_load("key", loader), "stale")
+        self.assertEqual(len(cache), 0)
+
+    def test_evicted_by_cost_in_lru_order(self):
+        cache = LRUCache(max_entries=None, max_cost=10)
+        cache.set("a", 1, cost=4)
+        cache.set("b", 2, cost=4)
+        cache.get("a")
+        cache.set("c", 3, cost=4)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(cache.stats()["cost"], 8)
+
+        # replacing an entry replaces its cost
+        cache.set("a", 1, cost=1)
+        self.assertEqual(cache.stats()["cost"], 5)
+        cache.delete("c")
+        self.assertEqual(cache.stats()["cost"], 1)
+
+    def test_evicted_by_entries_in_lru_order(self):
+        cache = LRUCache(max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(len(cache), 2)
+
+    def test_entries_expire(self):
+        cache = LRUCache(ttl=10)
+        cache.set("default", 1)
+        cache.set("short", 2, ttl=1)
+        later = time.monotonic() + 5
+        with mock.patch("wakka.cache.time.monotonic", return_value=later):
+            self.assertEqual(cache.get("default"), 1)
+            self.assertIsNone(cache.get("short"))
+            self.assertIsNone(cache.pop("short"))
+        self.assertEqual(len(cache), 1)
+
+    def test_counts_hits_and_misses(self):
+        cache = LRUCache()
+        cache.get("key")
+        cache.get_or_load("key", lambda: "value")
+        cache.get("key")
+        cache.get_or_load("key", lambda: "other")
+        self.assertEqual(
+            cache.stats(), {"hits": 2, "misses": 2, "entries": 1, "cost": 1}
+        )
@@ -0,0 +1,248 @@
+from contextlib import contextmanager
+from unittest import mock
+
+import jwt
+from django.core import mail
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, reverse
+
+from wakka import urls
+from wakka.budgets import ENDPOINT_BUDGETS, Budget
+from wakka.buffers import LastLoginBuffer
+from wakka.constants import OneTimeTokenType
+from wakka.hashers import PasswordHashingExecutor, ServerApiKeyHasher
+from wakka.models import Application, User
+from wakka.outbox import EmailOutbox
+from wakka.registry import ApplicationRegistry
+from wakka.services import AuthService, ping_database
+from wakka.tokens import JWTToken
+
+SAVEPOINT_STATEMENTS = ("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT")
+
+
+def get_routes(patterns, namespace=None):
+    """(view name, method) of every route, one per handler of its view"""
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from get_routes(pattern.url_patterns, pattern.namespace)
+        elif isinstance(pattern, URLPattern):
+            view_class = pattern.callback.view_class
+            for method in view_class.http_method_names:
+                if method != "options" and hasattr(view_class, method):
+                    yield f"{namespace}:{pattern.name}", method.upper()
+
+
+class EndpointBudgetTests(TestCase):
+    """Every endpoint stays within its budget of queries, password hashes
+    and JWT operations in `ENDPOINT_BUDGETS`."""
+
+    password = "S3cure!password"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.app = Application(app_name="budgets", title="Budgets")
+        cls.app.generate_server_api_key()
+        cls.user = AuthService.create_user(
+            email="john@example.com",
+            password=cls.password,
+            name="John",
+            app=cls.app,
+        )
+
+    def setUp(self):
+        ApplicationRegistry.invalidate()
+        ServerApiKeyHasher._verified.clear()
+        JWTToken._verified_tokens.clear()
+        AuthService._health_check_cache.clear()
+        LastLoginBuffer._pending.clear()
+        self.client.defaults.update(
+            HTTP_X_APP_NAME=self.app.app_name,
+            HTTP_X_SERVER_API_KEY=self.app.server_api_key,
+        )
+
+    def verify_user(self):
+        User.objects.filter(pk=self.user.pk).update(verified=True, is_active=True)
+
+    @contextmanager
+    def assertWithinBudget(self, view_name: str, method: str):
+        budget = ENDPOINT_BUDGETS[(view_name, method)]
+        thread_queries = []
+
+        def capture_ping_database():
+            # the health check queries on the connection of its own thread
+            with CaptureQueriesContext(connection) as ping_queries:
+                latency = ping_database()
+            thread_queries.extend(ping_queries.captured_queries)
+            return latency
+
+        with CaptureQueriesContext(connection) as queries, mock.patch(
+            "wakka.services.ping_database", capture_ping_database
+        ), mock.patch.object(
+            PasswordHashingExecutor, "_run", wraps=PasswordHashingExecutor._run
+        ) as hashes, mock.patch.object(
+            jwt, "encode", wraps=jwt.encode
+        ) as signs, mock.patch.object(
+            jwt, "decode", wraps=jwt.decode
+        ) as verifies:
+            yield
+        # savepoints are only taken inside the transaction of the test case
+        sql = [
+            query["sql"]
+            for query in [*queries.captured_queries, *thread_queries]
+            if not query["sql"].startswith(SAVEPOINT_STATEMENTS)
+        ]
+        used = Budget(
+            len(sql), hashes.call_count, signs.call_count, verifies.call_count
+        )
+        sql = "\n".join(sql)
+        self.assertEqual(used, budget, f"{method} {view_name}, queries:\n{sql}")
+
+    def test_every_route_has_a_budget(self):
+        self.assertEqual(set(get_routes(urls.urlpatterns)), set(ENDPOINT_BUDGETS))
+
+    def test_health_live(self):
+        with self.assertWithinBudget("api:health-live", "GET"):
+            response = self.client.get(reverse("api:health-live"))
+        self.assertEqual(response.status_code, 200)
+
+    def test_health_ready(self):
+        with self.assertWithinBudget("api:health-ready", "GET"):
+            response = self.client.get(reverse("api:health-ready"))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["data"]["database"])
+
+    def test_test_api(self):
+        with self.assertWithinBudget("api:test", "GET"):
+            response = self.client.get(reverse("api:test"))
+        self.assertEqual(response.status_code, 200)
+
+    def test_create_user(self):
+        with self.assertWithinBudget("api:user", "POST"):
+            response = self.client.post(
+                reverse("api:user"),
+                {
+                    "email": "jane@example.com",
+                    "password": self.password,
+                    "name": "Jane",
+                },
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["data"]["app"], self.app.app_name)
+
+    def test_get_user(self):
+        url = reverse("api:user-detail", args=[self.user.pk])
+        with self.assertWithinBudget("api:user-detail", "GET"):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["data"]["email"], self.user.email)
+
+    def test_update_user(self):
+        self.verify_user()
+        url = reverse("api:user-detail", args=[self.user.pk])
+        with self.assertWithinBudget("api:user-detail", "PUT"):
+            response = self.client.put(
+                url, {"name": "Johnny"}, content_type="application/json"
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["data"]["name"], "Johnny")
+
+    def test_delete_user(self):
+        url = reverse("api:user-detail", args=[self.user.pk])
+        with self.assertWithinBudget("api:user-detail", "DELETE"):
+            response = self.client.delete(url)
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+
+    def test_obtain_token(self):
+        self.verify_user()
+        with self.assertWithinBudget("api:obtain_token", "POST"):
+            response = self.client.post(
+                reverse("api:obtain_token"),
+                {"email": self.user.email, "password": self.password},
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            set(response.json()["data"]), {"access_token", "refresh_token"}
+        )
+
+    def test_refresh_token(self):
+        self.verify_user()
+        self.user.refresh_from_db()
+        refresh_token = JWTToken.obtain_refresh_token_for_user(user=self.user)
+        JWTToken._verified_tokens.clear()
+        with self.assertWithinBudget("api:refresh_token", "POST"):
+            response = self.client.post(
+                reverse("api:refresh_token"),
+                {"refresh_token": refresh_token},
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("access_token", response.json()["data"])
+
+    def test_send_verification_email(self):
+        with self.assertWithinBudget("api:send-verification-email", "POST"):
+            response = self.client.post(
+                reverse("api:send-verification-email"),
+                {"user_id": str(self.user.pk)},
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 200)
+        # queued for the outbox worker
+        self.assertEqual(len(mail.outbox), 0)
+        EmailOutbox.deliver()
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_send_forgot_password_email(self):
+        with self.assertWithinBudget("api:send-forgot-password-email", "POST"):
+            response = self.client.post(
+                reverse("api:send-forgot-password-email"),
+                {"email": self.user.email},
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 200)
+        # queued for the outbox worker
+        self.assertEqual(len(mail.outbox), 0)
+        EmailOutbox.deliver()
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_verify_email(self):
+        token = AuthService.generate_one_time_verification_token(
+            user=self.user, type=OneTimeTokenType.EMAIL_VERIFICATION.value
+        )
+        with self.assertWithinBudget("one-time:verify-email", "GET"):
+            response = self.client.get(
+                reverse("one-time:verify-email"), {"token": token}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(User.objects.get(pk=self.user.pk).verified)
+
+    def test_reset_password_page(self):
+        token = AuthService.generate_one_time_verification_token(
+            user=self.user, type=OneTimeTokenType.FOROGT_PASSWORD.value
+        )
+        with self.assertWithinBudget("one-time:reset-password", "GET"):
+            response = self.client.get(
+                reverse("one-time:reset-password"), {"token": token}
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def test_reset_password(self):
+        token = AuthService.generate_one_time_verification_token(
+            user=self.user, type=OneTimeTokenType.FOROGT_PASSWORD.value
+        )
+        new_password = "N3w!password"
+        with self.assertWithinBudget("one-time:reset-password", "POST"):
+            response = self.client.post(
+                reverse("one-time:reset-password"),
+                {
+                    "token": token,
+                    "new_password": new_password,
+                    "confirm_password": new_password,
+                },
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(User.objects.get(pk=self.user.pk).check_password(new_password))
@@ -0,0 +1,166 @@
+import threading
+from unittest import mock
+
+from django.contrib.auth.hashers import check_password
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from wakka.exceptions import PasswordHashingUnavailableException
+from wakka.hashers import PasswordHashingExecutor, ServerApiKeyHasher
+from wakka.models import Application, User
+from wakka.registry import ApplicationRegistry
+from wakka.services import AuthService
+
+
+def process_pool(**settings):
+    return mock.patch.dict(
+        PasswordHashingExecutor._settings, {"PROCESS_POOL": True, **settings}
+    )
+
+
+class ProcessPoolTests(SimpleTestCase):
+    """The test settings hash inline, these run the spawned process pool"""
+
+    @classmethod
+    def tearDownClass(cls):
+        if PasswordHashingExecutor._executor is not None:
+            PasswordHashingExecutor._executor.shutdown()
+            PasswordHashingExecutor._executor = None
+        super().tearDownClass()
+
+    def test_hashes_in_the_pool(self):
+        with process_pool():
+            encoded = PasswordHashingExecutor.make_password("S3cure!password")
+            user = User(password=encoded)
+            self.assertTrue(
+                PasswordHashingExecutor.check_password(user, "S3cure!password")
+            )
+            self.assertFalse(PasswordHashingExecutor.check_password(user, "wrong"))
+        self.assertTrue(check_password("S3cure!password", encoded))
+        self.assertIsNotNone(PasswordHashingExecutor._executor)
+
+    async def test_async_hashes_in_the_pool(self):
+        with process_pool():
+            user = User(password=PasswordHashingExecutor.make_password("secret"))
+            self.assertTrue(
+                await PasswordHashingExecutor.acheck_password(user, "secret")
+            )
+
+    def test_slots_are_released(self):
+        slots = threading.BoundedSemaphore(1)
+        with process_pool(), mock.patch.object(
+            PasswordHashingExecutor, "_slots", slots
+        ):
+            PasswordHashingExecutor.make_password("secret")
+            PasswordHashingExecutor.make_password("secret")
+        self.assertTrue(slots.acquire(blocking=False))
+
+    def test_full_pool_is_refused(self):
+        slots = threading.BoundedSemaphore(1)
+        slots.acquire()
+        with process_pool(), mock.patch.object(
+            PasswordHashingExecutor, "_slots", slots
+        ), self.assertRaises(PasswordHashingUnavailableException):
+            PasswordHashingExecutor.make_password("secret")
+
+
+class PasswordHashingUnavailableTests(TestCase):
+    password = "S3cure!password"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.app = Application.objects.create(app_name="busy", title="Busy")
+        cls.user = AuthService.create_user(
+            email="jane@example.com", password=cls.password, name="Jane", app=cls.app
+        )
+        User.objects.filter(pk=cls.user.pk).update(verified=True, is_active=True)
+
+    def setUp(self):
+        ApplicationRegistry.invalidate()
+
+    def test_login_fails_fast_with_retry_after(self):
+        # every slot of the pool is taken by other requests
+        with process_pool(), mock.patch.object(
+            PasswordHashingExecutor, "_slots", threading.BoundedSemaphore(0)
+        ):
+            response = self.client.post(
+                reverse("api:obtain_token"),
+                {"email": self.user.email, "password": self.password},
+                content_type="application/json",
+                HTTP_X_APP_NAME=self.app.app_name,
+            )
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()["code"], "PASSWORD_HASHING_UNAVAILABLE")
+        self.assertEqual(
+            response["Retry-After"],
+            "%d" % PasswordHashingUnavailableException.wait,
+        )
+
+
+class SetPasswordTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.app = Application.objects.create(app_name="passwords", title="Passwords")
+        cls.user = AuthService.create_user(
+            email="jane@example.com",
+            password="S3cure!password",
+            name="Jane",
+            app=cls.app,
+        )
+
+    def test_change_password_runs_the_password_changed_hooks(self):
+        with mock.patch(
+            "django.contrib.auth.base_user.password_validation.password_changed"
+        ) as password_changed:
+            AuthService.change_password(self.user, "N3w!password")
+        password_changed.assert_called_once_with("N3w!password", self.user)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password("N3w!password"))
+
+    def test_create_user_runs_the_password_changed_hooks(self):
+        with mock.patch(
+            "django.contrib.auth.base_user.password_validation.password_changed"
+        ) as password_changed:
+            user = AuthService.create_user(
+                email="john@example.com",
+                password="S3cure!password",
+                name="John",
+                app=self.app,
+            )
+        password_changed.assert_called_once_with("S3cure!password", user)
+
+
+class ServerApiKeyHasherTests(TestCase):
+    def setUp(self):
+        ServerApiKeyHasher._verified.clear()
+        self.app = Application(app_name="hashers", title="Hashers")
+        self.app.generate_server_api_key()
+
+    def test_key_survives_the_rotation_of_the_secret_key(self):
+        old_secret = "old-" + "x" * 50
+        with override_settings(SECRET_KEY=old_secret):
+            self.app.generate_server_api_key()
+        server_api_key = self.app.server_api_key
+        self.app.nullify_server_api_key()
+
+        with override_settings(
+            SECRET_KEY="new-" + "y" * 50, SECRET_KEY_FALLBACKS=[old_secret]
+        ):
+            app = Application.objects.get(pk=self.app.pk)
+            self.assertTrue(app.check_server_api_key(server_api_key))
+            # rehashed under the new secret key
+            app = Application.objects.get(pk=self.app.pk)
+            self.assertEqual(
+                app.server_api_key_hash, ServerApiKeyHasher.make(server_api_key)
+            )
+
+        ServerApiKeyHasher._verified.clear()
+        with override_settings(SECRET_KEY="new-" + "y" * 50, SECRET_KEY_FALLBACKS=[]):
+            app = Application.objects.get(pk=self.app.pk)
+            self.assertTrue(app.check_server_api_key(server_api_key))
+            self.assertFalse(app.check_server_api_key("wrong"))
+
+    def test_key_of_the_current_secret_key_is_not_rehashed(self):
+        with mock.patch.object(Application, "save") as save:
+            self.assertTrue(self.app.check_server_api_key(self.app.server_api_key))
+        save.assert_not_called()
@@ -0,0 +1,56 @@
+from unittest import mock
+
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from wakka.budgets import ENDPOINT_BUDGETS, Budget
+from wakka.middleware import QueryBudgetExceeded, install_query_counter
+from wakka.models import Application
+from wakka.registry import ApplicationRegistry
+from wakka.services import AuthService
+
+
+@override_settings(
+    QUERY_BUDGET_SETTINGS={
+        **settings.QUERY_BUDGET_SETTINGS,
+        "ENABLED": True,
+        "RAISE": True,
+    }
+)
+class QueryBudgetMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.app = Application(app_name="budgets", title="Budgets")
+        cls.app.generate_server_api_key()
+
+    def setUp(self):
+        ApplicationRegistry.invalidate()
+        self.client.defaults.update(
+            HTTP_X_APP_NAME=self.app.app_name,
+            HTTP_X_SERVER_API_KEY=self.app.server_api_key,
+        )
+
+    def test_query_count_header(self):
+        response = self.client.get(reverse("api:test"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response["X-Query-Count"],
+            str(ENDPOINT_BUDGETS[("api:test", "GET")].queries),
+        )
+
+    def test_health_check_query_is_counted(self):
+        AuthService._health_check_cache.clear()
+        # the connection of the health check thread may predate the middleware
+        AuthService._health_check_executor.submit(
+            install_query_counter, None, connection
+        ).result()
+        response = self.client.get(reverse("api:health-ready"))
+        self.assertEqual(response["X-Query-Count"], "1")
+
+    def test_over_budget_raises(self):
+        with mock.patch.dict(
+            ENDPOINT_BUDGETS, {("api:test", "GET"): Budget(0, 0, 0, 0)}
+        ), self.assertRaisesMessage(QueryBudgetExceeded, "GET api:test ran 1"):
+            self.client.get(reverse("api:test"))
@@ -0,0 +1,141 @@
+import datetime
+from io import StringIO
+from smtplib import SMTPRecipientsRefused, SMTPServerDisconnected
+from unittest import mock
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from wakka.mail import EmailConnection
+from wakka.models import OutboxEmail
+from wakka.outbox import EmailOutbox
+
+
+class EmailOutboxTests(TestCase):
+    def enqueue(self, count: int = 1) -> list[OutboxEmail]:
+        return [
+            EmailOutbox.enqueue(
+                to=f"user{i}@example.com", subject="Subject", body="<p>Body</p>"
+            )
+            for i in range(count)
+        ]
+
+    def setUp(self):
+        EmailConnection.close()
+
+    def test_batches_share_one_connection(self):
+        self.enqueue(3)
+        with mock.patch.object(EmailBackend, "open", autospec=True) as open:
+            EmailOutbox.deliver(batch_size=2)
+            EmailOutbox.deliver(batch_size=2)
+        self.assertEqual(open.call_count, 1)
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_lost_connection_is_reopened(self):
+        self.enqueue(2)
+        send_messages = EmailBackend.send_messages
+        lost = [SMTPServerDisconnected("idle")]
+
+        def send_once_lost(backend, messages):
+            if lost:
+                raise lost.pop()
+            return send_messages(backend, messages)
+
+        with mock.patch.object(
+            EmailBackend, "send_messages", autospec=True, side_effect=send_once_lost
+        ), mock.patch.object(EmailBackend, "open", autospec=True) as open:
+            self.assertEqual(EmailOutbox.deliver(), (2, 0))
+        self.assertEqual(open.call_count, 2)
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_refused_recipient_keeps_the_connection(self):
+        self.enqueue(2)
+        send_messages = EmailBackend.send_messages
+        refused = [SMTPRecipientsRefused({"user0@example.com": (550, b"unknown")})]
+
+        def send_once_refused(backend, messages):
+            if refused:
+                raise refused.pop()
+            return send_messages(backend, messages)
+
+        with mock.patch.object(
+            EmailBackend, "send_messages", autospec=True, side_effect=send_once_refused
+        ), mock.patch.object(
+            EmailBackend, "open", autospec=True
+        ) as open, self.assertLogs(
+            "wakka.outbox", "WARNING"
+        ):
+            self.assertEqual(EmailOutbox.deliver(), (1, 1))
+        self.assertEqual(open.call_count, 1)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_deliver(self):
+        self.enqueue(3)
+        self.assertEqual(EmailOutbox.deliver(), (3, 0))
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(mail.outbox[0].content_subtype, "html")
+        self.assertEqual(
+            OutboxEmail.objects.filter(status=OutboxEmail.Status.SENT).count(), 3
+        )
+        self.assertEqual(EmailOutbox.deliver(), (0, 0))
+
+    def test_claimed_emails_are_leased(self):
+        self.enqueue(3)
+        self.assertEqual(len(EmailOutbox.claim(batch_size=2)), 2)
+        self.assertEqual(len(EmailOutbox.claim()), 1)
+        self.assertEqual(EmailOutbox.claim(), [])
+
+    def test_failed_delivery_is_retried_with_backoff(self):
+        (email,) = self.enqueue()
+        with mock.patch.object(
+            EmailBackend, "send_messages", side_effect=SMTPServerDisconnected("gone")
+        ), self.assertLogs("wakka.outbox", "WARNING"):
+            self.assertEqual(EmailOutbox.deliver(), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboxEmail.Status.PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertIn("SMTPServerDisconnected", email.last_error)
+        # due again once the backoff passed
+        OutboxEmail.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(EmailOutbox.deliver(), (1, 0))
+
+    def test_failed_delivery_gives_up(self):
+        (email,) = self.enqueue()
+        OutboxEmail.objects.update(attempts=EmailOutbox._settings["MAX_ATTEMPTS"] - 1)
+        with mock.patch.object(
+            EmailBackend, "send_messages", side_effect=SMTPRecipientsRefused({})
+        ) as send_messages, self.assertLogs("wakka.outbox", "ERROR"):
+            EmailOutbox.deliver()
+        # refused, not sent again over a new connection
+        self.assertEqual(send_messages.call_count, 1)
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboxEmail.Status.FAILED)
+        self.assertEqual(email.last_error, "SMTPRecipientsRefused: {}")
+
+    def test_abandoned_last_attempt_is_not_sent_again(self):
+        (email,) = self.enqueue()
+        # claimed for the last time by a worker which died before sending
+        OutboxEmail.objects.update(attempts=EmailOutbox._settings["MAX_ATTEMPTS"])
+        with self.assertLogs("wakka.outbox", "ERROR"):
+            self.assertEqual(EmailOutbox.deliver(), (0, 0))
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboxEmail.Status.FAILED)
+        self.assertEqual(email.attempts, EmailOutbox._settings["MAX_ATTEMPTS"])
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_purge_sent(self):
+        self.enqueue(2)
+        EmailOutbox.deliver()
+        self.assertEqual(EmailOutbox.purge_sent(), 0)
+        OutboxEmail.objects.update(
+            next_attempt_at=timezone.now() - datetime.timedelta(days=30)
+        )
+        self.assertEqual(EmailOutbox.purge_sent(), 2)
+
+    def test_command(self):
+        self.enqueue(3)
+        call_command("send_outbox_emails", "--once", stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 3)
@@ -0,0 +1,97 @@
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from wakka.db.pool import ConnectionPool, ConnectionPoolTimeout, ProcessLocalPools
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def make_pool(self, **kwargs) -> ConnectionPool:
+        return ConnectionPool(mock.Mock(side_effect=lambda: mock.Mock()), **kwargs)
+
+    def test_released_connection_is_reused(self):
+        pool = self.make_pool()
+        connection, idle = pool.acquire()
+        self.assertIsNone(idle)
+        pool.release(connection)
+        reused, idle = pool.acquire()
+        self.assertIs(reused, connection)
+        self.assertGreaterEqual(idle, 0)
+        self.assertEqual(pool.connect.call_count, 1)
+        self.assertEqual(pool.stats(), {"size": 1, "idle": 0})
+
+    def test_most_recently_released_first(self):
+        pool = self.make_pool(max_size=2)
+        first, _ = pool.acquire()
+        second, _ = pool.acquire()
+        pool.release(first)
+        pool.release(second)
+        self.assertIs(pool.acquire()[0], second)
+
+    def test_exhausted_pool_times_out(self):
+        pool = self.make_pool(max_size=1, wait_timeout=0.05)
+        pool.acquire()
+        with self.assertRaises(ConnectionPoolTimeout):
+            pool.acquire()
+        self.assertEqual(pool.connect.call_count, 1)
+
+    def test_waiter_gets_the_released_connection(self):
+        pool = self.make_pool(max_size=1, wait_timeout=5)
+        connection, _ = pool.acquire()
+        acquired = []
+        waiter = threading.Thread(target=lambda: acquired.append(pool.acquire()[0]))
+        waiter.start()
+        pool.release(connection)
+        waiter.join(timeout=5)
+        self.assertEqual(acquired, [connection])
+
+    def test_idle_connections_expire_above_min_size(self):
+        pool = self.make_pool(min_size=1, max_size=3, idle_timeout=60)
+        with mock.patch("wakka.db.pool.time.monotonic", return_value=1000.0):
+            connections = [pool.acquire()[0] for _ in range(3)]
+            for connection in connections:
+                pool.release(connection)
+        with mock.patch("wakka.db.pool.time.monotonic", return_value=1061.0):
+            kept, _ = pool.acquire()
+        # the oldest two are closed, the last released one is kept
+        self.assertIs(kept, connections[2])
+        connections[0].close.assert_called_once()
+        connections[1].close.assert_called_once()
+        kept.close.assert_not_called()
+        self.assertEqual(pool.stats(), {"size": 1, "idle": 0})
+
+    def test_discarded_connection_frees_its_slot(self):
+        pool = self.make_pool(max_size=1, wait_timeout=0.05)
+        broken, _ = pool.acquire()
+        pool.discard(broken)
+        broken.close.assert_called_once()
+        connection, idle = pool.acquire()
+        self.assertIsNot(connection, broken)
+        self.assertIsNone(idle)
+
+    def test_failed_connect_frees_its_slot(self):
+        pool = ConnectionPool(
+            mock.Mock(side_effect=[OSError("refused"), mock.Mock()]), max_size=1
+        )
+        with self.assertRaises(OSError):
+            pool.acquire()
+        self.assertEqual(pool.stats(), {"size": 0, "idle": 0})
+        pool.acquire()
+
+    def test_close_all(self):
+        pool = self.make_pool(max_size=2)
+        connections = [pool.acquire()[0] for _ in range(2)]
+        pool.release(connections[0])
+        pool.close_all()
+        connections[0].close.assert_called_once()
+        self.assertEqual(pool.stats(), {"size": 1, "idle": 0})
+
+
+class ProcessLocalPoolsTests(SimpleTestCase):
+    def test_pools_are_recreated_after_fork(self):
+        pools = ProcessLocalPools()
+        pool = pools.get_or_create("default", lambda: ConnectionPool(mock.Mock()))
+        self.assertIs(pools.get("default"), pool)
+        with mock.patch("wakka.db.pool.os.getpid", return_value=-1):
+            self.assertIsNone(pools.get("default"))
@@ -0,0 +1,40 @@
+from django.test import TestCase
+
+from wakka.models import Application, User
+
+
+class UserLookupQueryPlanTests(TestCase):
+    """The user lookups by email must not scan the users of the app"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.app = Application.objects.create(app_name="plans", title="Plans")
+        User.objects.bulk_create(
+            User(
+                email=f"user{i}@example.com",
+                username=f"plans$$user{i}@example.com",
+                app=cls.app,
+            )
+            for i in range(100)
+        )
+
+    def assertUsesIndex(self, queryset):
+        """The unique (app, email) index is named in the MySQL plan, SQLite
+        shows the columns searched through its automatic index instead."""
+        plan = queryset.explain()
+        self.assertTrue(
+            "user_app_email_uniq" in plan or "(app_id=? AND email=?" in plan,
+            f"(app, email) index not used by the query plan:\n{plan}",
+        )
+
+    def test_get_user_by_email_uses_index(self):
+        # `AuthService.get_user_by_email`, soft deleted users are filtered out
+        queryset = User.objects.filter(email="user1@example.com", app=self.app)
+        self.assertUsesIndex(queryset)
+
+    def test_include_deleted_lookup_uses_index(self):
+        # `AuthService.create_user`
+        queryset = User.objects.include_deleted().filter(
+            email="user1@example.com", app=self.app
+        )
+        self.assertUsesIndex(queryset)
@@ -0,0 +1,62 @@
+import time
+from unittest import mock
+
+from django.test import TestCase
+
+from wakka.models import Application
+from wakka.registry import ApplicationRegistry
+
+
+class DefaultApplicationTests(TestCase):
+    def setUp(self):
+        # creating the row invalidates the registry
+        ApplicationRegistry.get_default()
+        ApplicationRegistry.invalidate()
+
+    def test_default_app_expires_after_the_ttl(self):
+        app = ApplicationRegistry.get_default()
+        with self.assertNumQueries(0):
+            self.assertEqual(ApplicationRegistry.get_default(), app)
+        # changed by another process, seen once the entry expires
+        later = time.monotonic() + ApplicationRegistry._settings["TTL"].total_seconds()
+        with mock.patch("wakka.cache.time.monotonic", return_value=later + 1):
+            with self.assertNumQueries(1):
+                self.assertEqual(ApplicationRegistry.get_default(), app)
+
+
+class RejectedAppNameTests(TestCase):
+    def setUp(self):
+        ApplicationRegistry.invalidate()
+
+    def test_invalid_app_name_is_rejected_without_a_query(self):
+        with self.assertNumQueries(0):
+            self.assertIsNone(ApplicationRegistry.get_by_app_name("Not Valid!"))
+            self.assertIsNone(ApplicationRegistry.get_by_app_name("a" * 100))
+            self.assertIsNone(ApplicationRegistry.get_by_app_name(""))
+
+    def test_missing_app_name_is_remembered(self):
+        with self.assertNumQueries(1):
+            self.assertIsNone(ApplicationRegistry.get_by_app_name("missing"))
+        with self.assertNumQueries(0):
+            self.assertIsNone(ApplicationRegistry.get_by_app_name("missing"))
+
+    def test_saving_the_app_forgets_the_miss(self):
+        self.assertIsNone(ApplicationRegistry.get_by_app_name("created"))
+        app = Application(app_name="created", title="Created")
+        app.generate_server_api_key()
+        with self.assertNumQueries(1):
+            self.assertEqual(ApplicationRegistry.get_by_app_name("created"), app)
+
+    def test_miss_expires_after_the_negative_ttl(self):
+        self.assertIsNone(ApplicationRegistry.get_by_app_name("created"))
+        # created by another process, which cannot invalidate this one
+        with mock.patch("wakka.signals.ApplicationRegistry.invalidate"):
+            app = Application(app_name="created", title="Created")
+            app.generate_server_api_key()
+        with self.assertNumQueries(0):
+            self.assertIsNone(ApplicationRegistry.get_by_app_name("created"))
+        ttl = ApplicationRegistry._settings["NEGATIVE_TTL"].total_seconds()
+        later = time.monotonic() + ttl
+        with mock.patch("wakka.cache.time.monotonic", return_value=later + 1):
+            with self.assertNumQueries(1):
+                self.assertEqual(ApplicationRegistry.get_by_app_name("created"), app)
@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TransactionTestCase, override_settings
+
+from wakka.exceptions import UserDoesNotExistException
+from wakka.models import Application, User
+from wakka.routers import ReplicaReads, email_key
+from wakka.services import AuthService
+
+
+@override_settings(
+    DATABASE_REPLICA_SETTINGS={
+        **settings.DATABASE_REPLICA_SETTINGS,
+        "REPLICAS": ["replica_0"],
+    }
+)
+class ReplicaRouterTests(TransactionTestCase):
+    """`replica_0` is a separate, empty database, a read served by it does not
+    find the rows written to the primary"""
+
+    databases = {"default", "replica_0"}
+
+    def setUp(self):
+        cache.clear()
+        self.app = Application.objects.create(title="App", app_name="app")
+        self.user = User.objects.create(
+            email="user@example.com", username="app_user@example.com", app=self.app
+        )
+
+    def test_writes_go_to_the_primary(self):
+        self.assertEqual(User.objects.using("default").count(), 1)
+        self.assertEqual(User.objects.using("replica_0").count(), 0)
+
+    def test_reads_go_to_the_replica(self):
+        with self.assertRaises(UserDoesNotExistException):
+            AuthService.get_user_by_id(self.user.pk)
+
+    def test_reads_after_a_write_stick_to_the_primary(self):
+        AuthService.stick_user(self.user)
+        self.assertEqual(AuthService.get_user_by_id(self.user.pk), self.user)
+
+    def test_sticky_email_ignores_case_and_form(self):
+        AuthService.stick_user(self.user)
+        for email in ["user@example.com", " USER@Example.com", "ｕｓｅｒ@example.com"]:
+            with ReplicaReads.using(email_key(self.app.pk, email)):
+                self.assertIsNone(ReplicaReads.choose_replica())
+        with ReplicaReads.using(email_key(self.app.pk, "other@example.com")):
+            self.assertEqual(ReplicaReads.choose_replica(), "replica_0")
+
+    def test_primary_block(self):
+        with ReplicaReads.primary():
+            self.assertEqual(AuthService.get_user_by_id(self.user.pk), self.user)
+
+    def test_replicas_need_a_shared_cache(self):
+        with self.assertRaises(ImproperlyConfigured):
+            ReplicaReads.check_cache()
@@ -0,0 +1,54 @@
+from unittest import mock
+
+from django.db import IntegrityError
+from django.test import TestCase
+
+from wakka.exceptions import UserAlreadyExistsException
+from wakka.models import Application, User
+from wakka.services import AuthService
+
+
+class CreateUserTests(TestCase):
+    """Sign ups insert directly and fall back to `_reclaim_and_insert_user`
+    when the unique (app, email) constraint finds an existing row."""
+
+    password = "S3cure!password"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.app = Application.objects.create(app_name="signups", title="Sign ups")
+
+    def create_user(self) -> User:
+        return AuthService.create_user(
+            email="jane@example.com", password=self.password, name="Jane", app=self.app
+        )
+
+    def test_reclaims_soft_deleted_email(self):
+        deleted = self.create_user()
+        deleted.delete()
+        with mock.patch.object(
+            AuthService,
+            "_reclaim_and_insert_user",
+            wraps=AuthService._reclaim_and_insert_user,
+        ) as reclaim:
+            user = self.create_user()
+        reclaim.assert_called_once()
+        self.assertNotEqual(user.pk, deleted.pk)
+        self.assertEqual(
+            list(User.objects.include_deleted().filter(app=self.app)), [user]
+        )
+
+    def test_active_duplicate_conflicts(self):
+        user = self.create_user()
+        with self.assertRaises(UserAlreadyExistsException) as error:
+            self.create_user()
+        self.assertEqual(error.exception.status_code, 409)
+        self.assertEqual(list(User.objects.filter(app=self.app)), [user])
+
+    def test_concurrent_sign_up_conflicts(self):
+        # the row of the winner is not visible yet, both inserts conflict
+        with mock.patch.object(
+            User, "save", side_effect=IntegrityError("user_app_email_uniq")
+        ) as save, self.assertRaises(UserAlreadyExistsException):
+            self.create_user()
+        self.assertEqual(save.call_count, 2)
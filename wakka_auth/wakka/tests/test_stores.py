@@ -0,0 +1,75 @@
+import datetime
+import threading
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from wakka.stores import CacheTokenStore, DatabaseTokenStore, LocalTokenStore
+
+
+class TokenStoreTestMixin:
+    store = None
+
+    def expires_in(self, seconds: float) -> datetime.datetime:
+        return timezone.now() + datetime.timedelta(seconds=seconds)
+
+    def test_consume_once(self):
+        jti = uuid4().bytes
+        self.store.add(jti, self.expires_in(60))
+        self.assertTrue(self.store.consume(jti))
+        self.assertFalse(self.store.consume(jti))
+
+    def test_unknown_token(self):
+        self.assertFalse(self.store.consume(uuid4().bytes))
+
+    def test_expired_token(self):
+        jti = uuid4().bytes
+        self.store.add(jti, self.expires_in(-1))
+        self.assertFalse(self.store.consume(jti))
+
+
+class DatabaseTokenStoreTests(TokenStoreTestMixin, TestCase):
+    store = DatabaseTokenStore
+
+    def test_consume_is_one_query(self):
+        jti = uuid4().bytes
+        self.store.add(jti, self.expires_in(60))
+        with CaptureQueriesContext(connection) as queries:
+            self.store.consume(jti)
+        self.assertEqual(len(queries), 1)
+        self.assertTrue(queries[0]["sql"].startswith("DELETE"))
+
+
+class LocalTokenStoreTests(TokenStoreTestMixin, TestCase):
+    store = LocalTokenStore
+
+    def test_concurrent_consume(self):
+        jti = uuid4().bytes
+        self.store.add(jti, self.expires_in(60))
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.store.consume(jti)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results.count(True), 1)
+
+
+class CacheTokenStoreTests(TokenStoreTestMixin, TestCase):
+    store = CacheTokenStore
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_needs_a_shared_cache(self):
+        # the test settings use the process local memory cache
+        with self.assertRaises(ImproperlyConfigured):
+            self.store.check()
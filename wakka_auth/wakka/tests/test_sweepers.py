@@ -0,0 +1,47 @@
+import datetime
+from io import StringIO
+from uuid import uuid4
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from wakka.models import OnetimeTokenRecords
+from wakka.sweepers import OneTimeTokenSweeper
+
+
+class OneTimeTokenSweeperTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        OnetimeTokenRecords.objects.bulk_create(
+            OnetimeTokenRecords(
+                jti=uuid4().bytes,
+                expires_at=now + datetime.timedelta(minutes=minutes),
+            )
+            for minutes in [-30] * 25 + [30] * 5
+        )
+
+    def test_sweep_deletes_expired_records_only(self):
+        self.assertEqual(OneTimeTokenSweeper.sweep(batch_size=10), 25)
+        self.assertEqual(OnetimeTokenRecords.objects.count(), 5)
+        self.assertFalse(
+            OnetimeTokenRecords.objects.filter(expires_at__lt=timezone.now()).exists()
+        )
+
+    def test_sweep_stops_after_max_batches(self):
+        self.assertEqual(OneTimeTokenSweeper.sweep(batch_size=10, max_batches=2), 20)
+        self.assertEqual(OnetimeTokenRecords.objects.count(), 10)
+
+    def test_command(self):
+        call_command("sweep_one_time_tokens", "--batch-size", "7", stdout=StringIO())
+        self.assertEqual(OnetimeTokenRecords.objects.count(), 5)
+
+    def test_sweep_uses_expires_at_index(self):
+        plan = (
+            OnetimeTokenRecords.objects.filter(expires_at__lt=timezone.now())
+            .order_by("expires_at")
+            .values_list("id", flat=True)[:10]
+            .explain()
+        )
+        self.assertIn("onetime_token_expires_idx", plan)
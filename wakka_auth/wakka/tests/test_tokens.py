@@ -0,0 +1,159 @@
+import datetime
+import time
+from unittest import mock
+
+import jwt
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from wakka.buffers import LastLoginBuffer
+from wakka.cache import LRUCache
+from wakka.constants import AuthTokenType, OneTimeTokenType
+from wakka.exceptions import OneTimeTokenInvalidException
+from wakka.models import Application, OnetimeTokenRecords, User
+from wakka.services import AuthService
+from wakka.tokens import JWTToken, OneTimeJWTToken
+
+RECORD_MODES = {
+    OneTimeTokenType.EMAIL_VERIFICATION.value: "record",
+    OneTimeTokenType.FOROGT_PASSWORD.value: "record",
+}
+
+
+class OneTimeTokenTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.app = Application(app_name="tokens", title="Tokens")
+        cls.app.generate_server_api_key()
+        cls.user = AuthService.create_user(
+            email="john@example.com",
+            password="S3cure!password",
+            name="John",
+            app=cls.app,
+        )
+
+    def setUp(self):
+        LastLoginBuffer._pending.clear()
+
+    def generate(self, type: OneTimeTokenType) -> str:
+        return AuthService.generate_one_time_verification_token(
+            user=self.user, type=type.value
+        )
+
+    def test_stateless_token_writes_nothing(self):
+        self.generate(OneTimeTokenType.FOROGT_PASSWORD)
+        self.assertFalse(OnetimeTokenRecords.objects.exists())
+
+    def test_stateless_verification_token_is_single_use(self):
+        token = self.generate(OneTimeTokenType.EMAIL_VERIFICATION)
+        AuthService.validate_email_verification_token(token)
+        self.assertTrue(User.objects.get(pk=self.user.pk).verified)
+        with self.assertRaises(OneTimeTokenInvalidException):
+            AuthService.validate_email_verification_token(token)
+
+    def test_stateless_reset_token_is_used_up_by_the_new_password(self):
+        token = self.generate(OneTimeTokenType.FOROGT_PASSWORD)
+        # reloading the reset page does not use it up
+        AuthService.validate_forgot_password_token(token)
+        user = AuthService.validate_forgot_password_token(token)
+        AuthService.change_password(user=user, password="N3w!password")
+        with self.assertRaises(OneTimeTokenInvalidException):
+            AuthService.validate_forgot_password_token(token)
+
+    def test_stateless_token_survives_a_refresh(self):
+        User.objects.filter(pk=self.user.pk).update(
+            verified=True,
+            is_active=True,
+            last_login=timezone.now() - datetime.timedelta(hours=1),
+        )
+        token = AuthService.generate_one_time_verification_token(
+            user=User.objects.get(pk=self.user.pk),
+            type=OneTimeTokenType.FOROGT_PASSWORD.value,
+        )
+        # a session refreshing in the background between the reset page and
+        # the form post, its last login written by the buffer of any worker
+        refresh_token = JWTToken.obtain_refresh_token_for_user(self.user)
+        AuthService.get_access_token(refresh_token=refresh_token)
+        self.assertEqual(LastLoginBuffer.flush(), 1)
+        AuthService.validate_forgot_password_token(token)
+
+    def test_stateless_token_of_another_type(self):
+        token = self.generate(OneTimeTokenType.FOROGT_PASSWORD)
+        with self.assertRaises(OneTimeTokenInvalidException):
+            AuthService.validate_email_verification_token(token)
+
+    @mock.patch.dict(OneTimeJWTToken.modes, RECORD_MODES)
+    def test_recorded_token_is_single_use(self):
+        token = self.generate(OneTimeTokenType.FOROGT_PASSWORD)
+        self.assertEqual(OnetimeTokenRecords.objects.count(), 1)
+        AuthService.validate_forgot_password_token(token)
+        with self.assertRaises(OneTimeTokenInvalidException):
+            AuthService.validate_forgot_password_token(token)
+
+    def test_recorded_token_outlives_a_switch_to_stateless(self):
+        with mock.patch.dict(OneTimeJWTToken.modes, RECORD_MODES):
+            token = self.generate(OneTimeTokenType.EMAIL_VERIFICATION)
+        AuthService.validate_email_verification_token(token)
+        self.assertFalse(OnetimeTokenRecords.objects.exists())
+
+
+class VerifiedTokenCacheTests(SimpleTestCase):
+    """Verified payloads are kept until the token expires, so a repeated
+    verification skips the signature check"""
+
+    def setUp(self):
+        JWTToken._verified_tokens.clear()
+        self.addCleanup(JWTToken._verified_tokens.clear)
+
+    def token(self) -> str:
+        return JWTToken.obtain(payload={}, type=AuthTokenType.REFRESH_TOKEN)
+
+    def verify(self, token: str) -> dict:
+        return JWTToken.verify_token(token=token, type=AuthTokenType.REFRESH_TOKEN)
+
+    def test_hit_skips_the_signature_check(self):
+        token = self.token()
+        hits = JWTToken.verified_token_cache_stats()["hits"]
+        with mock.patch.object(jwt, "decode", wraps=jwt.decode) as decode:
+            payload = self.verify(token)
+            self.assertEqual(self.verify(token), payload)
+        self.assertEqual(decode.call_count, 1)
+        self.assertEqual(JWTToken.verified_token_cache_stats()["hits"], hits + 1)
+
+    def test_miss_checks_the_signature(self):
+        misses = JWTToken.verified_token_cache_stats()["misses"]
+        with mock.patch.object(jwt, "decode", wraps=jwt.decode) as decode:
+            self.verify(self.token())
+            self.verify(self.token())
+        self.assertEqual(decode.call_count, 2)
+        self.assertEqual(JWTToken.verified_token_cache_stats()["misses"], misses + 2)
+
+    def test_type_is_checked_on_a_hit(self):
+        token = self.token()
+        self.verify(token)
+        with self.assertRaises(OneTimeTokenInvalidException):
+            JWTToken.verify_token(token=token, type=AuthTokenType.ACCESS_TOKEN)
+
+    def test_evicted_by_cost(self):
+        first, second = self.token(), self.token()
+        # room for the payload of a single token
+        cache = LRUCache(max_entries=None, max_cost=3 * len(first) + 200)
+        with mock.patch.object(JWTToken, "_verified_tokens", cache):
+            self.verify(first)
+            self.verify(second)
+            self.assertEqual(len(cache), 1)
+            with mock.patch.object(jwt, "decode", wraps=jwt.decode) as decode:
+                self.verify(second)
+                self.verify(first)
+        self.assertEqual(decode.call_count, 1)
+
+    def test_expires_with_the_token(self):
+        token = self.token()
+        self.verify(token)
+        lifetime = JWTToken.refresh_token_lifetime.total_seconds()
+        later = time.monotonic() + lifetime + 1
+        with mock.patch("wakka.cache.time.monotonic", return_value=later):
+            self.assertEqual(len(JWTToken._verified_tokens), 1)
+            with mock.patch.object(jwt, "decode", wraps=jwt.decode) as decode:
+                self.verify(token)
+        self.assertEqual(decode.call_count, 1)
@@ -1,57 +1,117 @@
 import datetime
+import functools
+import hashlib
+import time
 from typing import Any, Mapping
 from uuid import uuid4
 
 import jwt
 from django.conf import settings
 from django.utils import timezone
+from django.utils.crypto import constant_time_compare, salted_hmac
+from django.utils.module_loading import import_string
 
+from .cache import LRUCache
 from .constants import AuthTokenType
 from .exceptions import OneTimeTokenExpiredException, OneTimeTokenInvalidException
-from .models import OnetimeTokenRecords, User
+from .models import User
+from .stores import OneTimeTokenStore
+
+
+@functools.cache
+def load_key(algorithm: str, key: str) -> Any:
+    """Parse a PEM key once for the algorithm and reuse the key object,
+    otherwise PyJWT parses the PEM string on every encode and decode."""
+    return jwt.get_algorithm_by_name(algorithm).prepare_key(key)
 
 
 class OneTimeJWTToken:
-    """Generating and verifying one time jwt tokens for email verification and password reset"""
+    """Generating and verifying one time jwt tokens for email verification and password reset
+
+    Tokens of a type in `record` mode are single use through their record in
+    the token store. Tokens of a type in `stateless` mode carry an HMAC of
+    the user state the token changes, e.g. the password hash for a password
+    reset, and are used up once that state changes. Issuing and verifying
+    them writes nothing, so repeated page loads and link previews are free.
+    """
 
     signing_key = settings.JWT_SETTINGS["SIGNING_KEY"]
     verifying_key = settings.JWT_SETTINGS["VERIFYING_KEY"]
     algorithm = settings.JWT_SETTINGS["ALGORITHM"]
     issuer = settings.JWT_SETTINGS["ISSUER"]
     token_lifetime = settings.JWT_SETTINGS["ONE_TIME_TOKEN_LIFETIME"]
+    modes = settings.JWT_SETTINGS["ONE_TIME_TOKEN_MODES"]
+    store: type[OneTimeTokenStore] = import_string(
+        settings.ONE_TIME_TOKEN_STORE_SETTINGS["BACKEND"]
+    )
 
     @classmethod
-    def obtain(cls, payload: dict) -> str:
-        """Generate a one time jwt token"""
-        jti = uuid4().hex
+    def obtain(cls, payload: dict, user: User = None) -> str:
+        """Generate a one time jwt token, stateless tokens are bound to `user`"""
+        jti = uuid4()
         expires_at = timezone.now() + cls.token_lifetime
+        stateless = cls.modes.get(payload.get("type")) == "stateless"
+        if stateless:
+            payload = {**payload, "state": cls.user_state(user, payload["type"])}
         token = jwt.encode(
-            payload={"iss": cls.issuer, "jti": jti, "exp": expires_at, **payload},
-            key=cls.signing_key,
+            payload={"iss": cls.issuer, "jti": jti.hex, "exp": expires_at, **payload},
+            key=load_key(cls.algorithm, cls.signing_key),
             algorithm=cls.algorithm,
         )
-        token_record = OnetimeTokenRecords(jti=jti, expires_at=expires_at)
-        token_record.save()
+        if not stateless:
+            cls.store.add(jti.bytes, expires_at)
         return token
 
     @classmethod
-    def verify(cls, token: str) -> Mapping[str, Any]:
-        """Verify a one time jwt token"""
+    def decode(cls, token: str) -> Mapping[str, Any]:
+        """Check the signature and expiry of a one time jwt token, the token
+        is not used up until `consume`"""
         try:
-            payload = jwt.decode(
-                jwt=token, key=cls.verifying_key, algorithms=[cls.algorithm]
+            return jwt.decode(
+                jwt=token,
+                key=load_key(cls.algorithm, cls.verifying_key),
+                algorithms=[cls.algorithm],
             )
         except jwt.ExpiredSignatureError:
             raise OneTimeTokenExpiredException
         except jwt.InvalidIssuerError:
             raise OneTimeTokenInvalidException
 
-        jti = payload["jti"]
-        token = OnetimeTokenRecords.objects.filter(jti=jti).first()
-        if token:
-            token.delete()
-            return payload
-        raise OneTimeTokenInvalidException
+    @classmethod
+    def consume(cls, payload: Mapping[str, Any], user: User = None) -> None:
+        """Use up a decoded token. Stateless tokens must still match the state
+        of `user`, the mode at issue decides, not the current one."""
+        if "state" in payload:
+            if user is None or not constant_time_compare(
+                payload["state"], cls.user_state(user, payload.get("type"))
+            ):
+                raise OneTimeTokenInvalidException
+            return
+        try:
+            jti = bytes.fromhex(payload["jti"])
+        except (KeyError, TypeError, ValueError):
+            raise OneTimeTokenInvalidException
+        # used, or expired between the decode and now
+        if not cls.store.consume(jti):
+            raise OneTimeTokenInvalidException
+
+    @classmethod
+    def verify(cls, token: str, user: User = None) -> Mapping[str, Any]:
+        """Verify a one time jwt token"""
+        payload = cls.decode(token)
+        cls.consume(payload, user)
+        return payload
+
+    @classmethod
+    def user_state(cls, user: User, type: str) -> str:
+        """HMAC of the user state a one time token of the type changes. Unlike
+        Django's `PasswordResetTokenGenerator` the last login is left out, it
+        is written late by `LastLoginBuffer` of any worker and by every
+        refresh, which would use up the tokens of active users."""
+        value = f"{user.pk}{user.password}{user.verified}{type}"
+        return salted_hmac(
+            "wakka.tokens.OneTimeJWTToken", value, algorithm="sha256"
+        ).hexdigest()[:32]
 
 
 class JWTToken:
@@ -86,43 +146,97 @@ class JWTToken:
                 "iat": iat,
                 "type": type.value,
             },
-            key=cls.signing_key,
+            key=load_key(cls.algorithm, cls.signing_key),
             algorithm=cls.algorithm,
         )
         return token
 
+    # verified payloads by token digest, kept until the token expires so
+    # repeated refreshes with the same token skip the signature check
+    _verified_tokens = LRUCache(
+        max_entries=None,
+        max_cost=settings.JWT_SETTINGS["VERIFIED_TOKEN_CACHE_SIZE"],
+    )
+
     @classmethod
     def verify_token(
         cls, token: str = None, type: AuthTokenType = None
     ) -> Mapping[str, Any]:
         """Verify a token"""
+        cache_key = cls._verified_token_cache_key(token)
+        payload = cls._verified_tokens.get(cache_key)
+        if payload is None:
+            payload = cls._decode(token)
+            cls._verified_tokens.set(
+                cache_key,
+                payload,
+                ttl=payload["exp"] - time.time(),
+                # rough size of the key, the payload and the bookkeeping
+                cost=2 * len(token) + 200,
+            )
+        if payload["type"] != type.value:
+            raise OneTimeTokenInvalidException
+        return dict(payload)
+
+    @classmethod
+    def _decode(cls, token: str) -> Mapping[str, Any]:
         try:
-            payload = jwt.decode(
-                jwt=token, key=cls.verifying_key, algorithms=[cls.algorithm]
+            return jwt.decode(
+                jwt=token,
+                key=load_key(cls.algorithm, cls.verifying_key),
+                algorithms=[cls.algorithm],
             )
-            if payload["type"] != type.value:
-                raise OneTimeTokenInvalidException
-            return payload
         except jwt.ExpiredSignatureError:
             raise OneTimeTokenExpiredException
         except jwt.InvalidIssuerError:
             raise OneTimeTokenInvalidException
 
     @classmethod
-    def obtain_refresh_token_for_user(cls, user: User = None) -> str:
-        """Generate a refresh token for a user"""
-        payload = {
+    def _verified_token_cache_key(cls, token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    @classmethod
+    def verified_token_cache_stats(cls) -> Mapping[str, int]:
+        return cls._verified_tokens.stats()
+
+    # claims describing the user, carried from the refresh to the access token
+    user_claims = ("user_id", "name", "email", "app")
+
+    @classmethod
+    def get_user_claims(cls, user: User = None) -> dict:
+        return {
             "user_id": str(user.id),
             "name": user.name,
             "email": user.email,
             "app": user.app.app_name,
         }
+
+    @classmethod
+    def obtain_refresh_token_for_user(cls, user: User = None) -> str:
+        """Generate a refresh token for a user"""
+        payload = cls.get_user_claims(user=user)
         return cls.obtain(payload=payload, type=AuthTokenType.REFRESH_TOKEN)
 
+    @classmethod
+    def obtain_access_token_for_user(cls, user: User = None) -> str:
+        """Generate an access token for a user"""
+        payload = cls.get_user_claims(user=user)
+        return cls.obtain(payload=payload, type=AuthTokenType.ACCESS_TOKEN)
+
+    @classmethod
+    def obtain_access_token_by_refresh_payload(
+        cls, refresh_payload: Mapping[str, Any] = None
+    ) -> str:
+        """Generate an access token from the payload of an already verified
+        refresh token. Only the user claims are carried over, the registered
+        claims like `jti`, `iat` and `exp` are issued fresh."""
+        payload = {claim: refresh_payload.get(claim) for claim in cls.user_claims}
+        return cls.obtain(payload=payload, type=AuthTokenType.ACCESS_TOKEN)
+
     @classmethod
     def obtain_access_token_by_refresh_token(cls, refresh_token: str = None) -> str:
         """Generate an access token by verifying a refresh token"""
         payload = cls.verify_token(
             token=refresh_token, type=AuthTokenType.REFRESH_TOKEN
         )
-        return cls.obtain(payload=payload, type=AuthTokenType.ACCESS_TOKEN)
+        return cls.obtain_access_token_by_refresh_payload(refresh_payload=payload)
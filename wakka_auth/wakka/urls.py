@@ -1,21 +1,37 @@
 from config.constants import API_URL, VERIFY_URL
+from config.env import ENV
 from django.urls import include, path
 
-from . import views
+from . import async_views, views
+
+# token and user detail views have async variants served on ASGI
+hot_views = async_views if ENV.ASGI == "true" else views
 
 test_urlpatterns = [path("test/", views.TestApiView.as_view(), name="test")]
+health_urlpatterns = [
+    path("health/live/", views.LivenessCheckView.as_view(), name="health-live"),
+    path("health/ready/", views.HealthCheckView.as_view(), name="health-ready"),
+]
 token_urlpatterns = [
     path(
         "obtain-token/",
-        views.TokenObtainPairView.as_view(),
+        hot_views.TokenObtainPairView.as_view(),
         name="obtain_token",
     ),
-    path("refresh-token/", views.TokenRefreshView.as_view(), name="refresh_token"),
+    path(
+        "refresh-token/",
+        hot_views.TokenRefreshView.as_view(),
+        name="refresh_token",
+    ),
 ]
 
 user_urlpatterns = [
     path("user/", views.UserView.as_view(), name="user"),
-    path("user/<str:user_id>/", views.UserDetailView.as_view(), name="user-detail"),
+    path(
+        "user/<str:user_id>/",
+        hot_views.UserDetailView.as_view(),
+        name="user-detail",
+    ),
 ]
 
 verify_urlpatterns = [
@@ -47,6 +63,7 @@ mail_urlpatterns = [
 api_urlpatterns = [
     *token_urlpatterns,
     *test_urlpatterns,
+    *health_urlpatterns,
     *user_urlpatterns,
     *mail_urlpatterns,
 ]
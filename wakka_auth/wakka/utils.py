@@ -1,5 +1,8 @@
+from django.http import JsonResponse
 from rest_framework.response import Response
 
+from .loggers import ResponseLogger
+
 
 class WakkaResponse(Response):
 
@@ -21,6 +24,16 @@ class WakkaResponse(Response):
         if status:
             actual_data = data
             data = {"data": actual_data, "status": status}
-            print("-" * 10, "DEBUG", "-" * 10)
-            print(data)
+            ResponseLogger.log(actual_data, status)
         super().__init__(data, status, template_name, headers, exception, content_type)
+
+
+class WakkaJsonResponse(JsonResponse):
+    """`WakkaResponse` counterpart for the plain Django async views,
+    using the same response schema."""
+
+    def __init__(self, data=None, status=200, headers=None):
+        ResponseLogger.log(data, status)
+        super().__init__(
+            {"data": data, "status": status}, status=status, headers=headers
+        )
@@ -21,11 +21,33 @@ from .services import AuthService
 from .utils import WakkaResponse
 
 
+@extend_schema(tags=["Health"])
 class HealthCheckView(APIView):
+    @extend_schema(
+        responses={status.HTTP_200_OK: serializers.HealthCheckResponseSerializer},
+        description="Readiness check, the database result is cached briefly",
+    )
     def get(self, request: Request):
-        status = AuthService.health_check()
-        serializer = serializers.HealthCheckResponseSerializer(status)
-        return WakkaResponse(serializer.data)
+        health = AuthService.health_check()
+        serializer = serializers.HealthCheckResponseSerializer(health)
+        response_status = (
+            status.HTTP_200_OK
+            if health["database"]
+            else status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+        return WakkaResponse(serializer.data, status=response_status)
+
+
+@extend_schema(tags=["Health"])
+class LivenessCheckView(APIView):
+    @extend_schema(
+        responses={status.HTTP_200_OK: serializers.LivenessCheckResponseSerializer},
+        description="Liveness check, does not touch the database",
+    )
+    def get(self, request: Request):
+        liveness = AuthService.liveness_check()
+        serializer = serializers.LivenessCheckResponseSerializer(liveness)
+        return WakkaResponse(serializer.data, status=status.HTTP_200_OK)
 
 
 @extend_schema(tags=["Test"])
@@ -192,7 +214,7 @@ class ForgotPasswordSendView(APIView):
             app=request.app,
         )
         if user:
-            AuthService.send_FORGOT_password_email(
+            AuthService.send_forgot_password_email(
                 user=user,
                 app=user.app,
                 domain=request.get_host(),
@@ -211,10 +233,9 @@ class ForgotPasswordPageView(APIView):
     def get(self, request: Request, *args, **kwargs):
         try:
             token = request.GET.get("token")
-            payload = AuthService.validate_forgot_password_token(token=token)
-            # get the user in the payload and generate a new token for the form
+            # generate a new token for the form of the user in the payload,
             # which will be used to reset the password
-            user = AuthService.get_user_by_id(payload.get("user_id"))
+            user = AuthService.validate_forgot_password_token(token=token)
             reset_password_form_token = (
                 AuthService.generate_one_time_verification_token(
                     user=user, type=OneTimeTokenType.FOROGT_PASSWORD.value
@@ -259,8 +280,7 @@ class ForgotPasswordPageView(APIView):
             token = serializer.validated_data["token"]
             password = serializer.validated_data["new_password"]
             # Validate the token and get the user, then change the password
-            payload = AuthService.validate_forgot_password_token(token=token)
-            user = AuthService.get_user_by_id(user_id=payload.get("user_id"))
+            user = AuthService.validate_forgot_password_token(token=token)
             AuthService.change_password(
                 user=user,
                 password=password,